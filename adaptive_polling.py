@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from weather import WeatherService
+from clock import SYSTEM_CLOCK
+from forecast_diff import snapshot_village, diff_snapshots, is_material
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+POLL_STATE_FILE = "rain_poll_state.json"
+
+# (최소 강수확률, 초단기예보 확인 간격(분)) - 위에서부터 먼저 맞는 구간 적용
+POLL_INTERVALS = [
+    (60, 10),
+    (30, 30),
+    (10, 60),
+    (0, 180),
+]
+
+
+class AdaptiveRainScheduler:
+    """단기예보 강수확률(POP)/강수형태(PTY)로 격자별 초단기예보 확인 주기 결정"""
+
+    def __init__(self, weather_service=None, state_file=POLL_STATE_FILE,
+                 tick_minutes=10, lookahead_hours=3, escalation_hours=2, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.weather_service = weather_service or WeatherService(clock=self.clock)
+        self.state_file = state_file
+        self.tick_minutes = tick_minutes
+        self.lookahead_hours = lookahead_hours
+        self.escalation_hours = escalation_hours
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        return {}
+
+    def save_state(self):
+        with open(self.state_file, "w") as f:
+            json.dump(self.state, f)
+
+    def _cell_state(self, nx, ny):
+        today = self.clock.now().strftime("%Y%m%d")
+        cell = self.state.setdefault(f"{nx},{ny}", {})
+        if cell.get("date") != today:
+            cell.update({"date": today, "ticks": 0, "polls": 0, "village_calls": 0})
+        return cell
+
+    def plan_interval(self, nx, ny):
+        """향후 lookahead_hours 시간의 단기예보로 확인 간격(분) 계산 (단기예보 API 호출 수도 기록)"""
+        cell = self._cell_state(nx, ny)
+        fetches = self.weather_service.fetches
+        forecast = self.weather_service.get_daily_forecast(nx, ny)
+        cell["village_calls"] = cell.get("village_calls", 0) + self.weather_service.fetches - fetches
+        if not forecast:
+            return self.tick_minutes
+
+        now = self.clock.now()
+        cell["village"] = snapshot_village(forecast, now, self.lookahead_hours)
+        until = now + timedelta(hours=self.lookahead_hours)
+        upcoming = []
+        for h in forecast["hourly"] + forecast["tomorrow"]:
+            fcst_datetime = datetime.strptime(f"{h['date']}{h['time']}", "%Y%m%d%H%M")
+            if now - timedelta(hours=1) < fcst_datetime <= until:
+                upcoming.append(h)
+
+        if not upcoming or any(h.get("pty", "0") != "0" for h in upcoming):
+            return self.tick_minutes
+
+        max_pop = max(h.get("pop", 0) for h in upcoming)
+        for min_pop, interval in POLL_INTERVALS:
+            if max_pop >= min_pop:
+                return max(interval, self.tick_minutes)
+        return self.tick_minutes
+
+    def is_due(self, nx, ny):
+        cell = self._cell_state(nx, ny)
+        cell["ticks"] += 1
+
+        next_check = cell.get("next_check")
+        if next_check and self.clock.now() < datetime.fromisoformat(next_check):
+            return self._village_changed(nx, ny, cell)
+        return True
+
+    def _village_changed(self, nx, ny, cell):
+        """새 단기예보 발표로 향후 강수 예보가 바뀌었으면 예정보다 일찍 확인
+
+        캐시에 이미 들어온 발표(워머/다른 흐름이 받은 것)만 비교 - 이 확인 때문에 API를 호출하지 않음
+        """
+        forecast = self.weather_service.get_cached_daily_forecast(nx, ny)
+        if not forecast:
+            return False
+
+        now = self.clock.now()
+        snapshot = snapshot_village(forecast, now, self.lookahead_hours)
+        changes = diff_snapshots(cell.get("village"), snapshot, now)
+        cell["village"] = snapshot
+        if is_material(changes):
+            logger.info(f"Village forecast changed at {nx},{ny}: {changes}. Checking early.")
+            return True
+        return False
+
+    def record_check(self, nx, ny, rain_info):
+        """초단기예보 확인 결과 기록 - 강수 감지 시 escalation_hours 동안 매 틱 확인"""
+        cell = self._cell_state(nx, ny)
+        cell["polls"] += 1
+        now = self.clock.now()
+
+        if rain_info:
+            cell["escalated_until"] = (now + timedelta(hours=self.escalation_hours)).isoformat()
+
+        escalated_until = cell.get("escalated_until")
+        if escalated_until and now < datetime.fromisoformat(escalated_until):
+            interval = self.tick_minutes
+        else:
+            interval = self.plan_interval(nx, ny)
+
+        # cron 실행 시각이 조금씩 밀려도 다음 틱에서 확인되도록 1분 여유
+        cell["next_check"] = (now + timedelta(minutes=interval - 1)).isoformat()
+        logger.info(f"Next ultra short check for {nx},{ny} in {interval} minutes")
+
+    def report(self, day=None):
+        """오늘(또는 day) 고정 주기(매 틱 초단기예보 1회) 대비 절약한 호출 수 - 주기 계산용 단기예보 호출 포함"""
+        today = day or self.clock.now().strftime("%Y%m%d")
+        cells = {key: cell for key, cell in self.state.items() if cell.get("date") == today}
+        ticks = sum(cell["ticks"] for cell in cells.values())
+        polls = sum(cell["polls"] for cell in cells.values())
+        village_calls = sum(cell.get("village_calls", 0) for cell in cells.values())
+        actual = polls + village_calls
+        return {
+            "cells": len(cells),
+            "fixed_calls": ticks,
+            "ultra_short_calls": polls,
+            "village_calls": village_calls,
+            "actual_calls": actual,
+            "saved_calls": ticks - actual,
+            "saved_ratio": (ticks - actual) / ticks if ticks else 0.0,
+        }
@@ -1,7 +1,11 @@
 import requests
+from datetime import timedelta
 import logging
 import os
 from dotenv import load_dotenv
+from quota import PRIORITY_ALERT
+from single_flight import SingleFlight, flight_key
+from clock import SYSTEM_CLOCK
 
 load_dotenv()
 
@@ -27,15 +31,54 @@ class AirQualityService:
         "잠실": "송파구",
     }
 
-    def __init__(self, service_key=None):
+    flight = SingleFlight()
+
+    def __init__(self, service_key=None, cache=None, quota=None, priority=PRIORITY_ALERT,
+                 clock=None, session=None):
         self.service_key = service_key or os.getenv("AIRKOREA_SERVICE_KEY")
         self.base_url = "https://apis.data.go.kr/B552584/ArpltnInforInqireSvc/getMsrstnAcctoRltmMesureDnsty"
+        self.cache = cache
+        self.quota = quota
+        self.priority = priority
+        self.clock = clock or SYSTEM_CLOCK
+        self.session = session or requests
+
+    def _get_base_time(self):
+        """에어코리아 실시간 측정값: 매시 정각 측정분이 ~15분 후 반영"""
+        base = self.clock.now() - timedelta(minutes=15)
+        return base.strftime("%Y%m%d%H")
 
     def get_air_quality(self, station_name="중구"):
         if not self.service_key:
             logger.error("AIRKOREA_SERVICE_KEY is missing.")
             return None
 
+        base = self._get_base_time()
+        return self.flight.do(flight_key(self, station_name, base), self._get_air_quality, station_name, base)
+
+    async def get_air_quality_async(self, station_name="중구"):
+        if not self.service_key:
+            logger.error("AIRKOREA_SERVICE_KEY is missing.")
+            return None
+
+        base = self._get_base_time()
+        return await self.flight.do_async(flight_key(self, station_name, base), self._get_air_quality, station_name, base)
+
+    def _get_air_quality(self, station_name, base):
+        if self.cache:
+            cached = self.cache.get("air_quality", station_name, base)
+            if cached is not None:
+                return cached
+
+        if self.quota and not self.quota.acquire(self.service_key, "getMsrstnAcctoRltmMesureDnsty", self.priority):
+            return self.cache.get_latest("air_quality", station_name)[0] if self.cache else None
+
+        air_data = self._fetch_air_quality(station_name)
+        if air_data is not None and self.cache:
+            self.cache.put("air_quality", station_name, base, air_data)
+        return air_data
+
+    def _fetch_air_quality(self, station_name):
         params = {
             "serviceKey": self.service_key,
             "returnType": "json",
@@ -47,7 +90,7 @@ class AirQualityService:
         }
 
         try:
-            response = requests.get(self.base_url, params=params, timeout=15)
+            response = self.session.get(self.base_url, params=params, timeout=15)
             response.raise_for_status()
             data = response.json()
 
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import sys
+import logging
+from dotenv import load_dotenv
+from weather import WeatherService
+from ultra_short_forecast import UltraShortForecastService
+from air_quality import AirQualityService
+from dust_forecast import DustForecastService
+from forecast_cache import ForecastCache
+from quota import QuotaLedger, PRIORITY_DIGEST
+from hedging import HedgedSession, default_session
+from subscribers import load_subscribers, distinct_cells, distinct_stations
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+KINDS = ("village", "ultra_short", "air_quality", "dust_forecast")
+
+
+class CacheWarmer:
+    """발표 직후 구독자 전체의 격자/측정소 데이터를 미리 받아 캐시에 저장
+
+    서비스를 넘기면 그대로 사용 (시뮬레이터처럼 같은 서비스를 다른 곳과 공유할 때)
+    """
+
+    def __init__(self, cache=None, subscribers=None, quota=None, clock=None, session=None,
+                 weather_service=None, ultra_service=None, air_service=None, dust_service=None):
+        self.cache = cache or ForecastCache()
+        self.subscribers = subscribers if subscribers is not None else load_subscribers()
+        quota = quota or QuotaLedger(clock=clock)
+        session = session or default_session(quota)
+        self.session = session
+        self.weather_service = weather_service or WeatherService(
+            cache=self.cache, quota=quota, priority=PRIORITY_DIGEST, clock=clock, session=session
+        )
+        self.ultra_service = ultra_service or UltraShortForecastService(
+            cache=self.cache, quota=quota, clock=clock, session=session
+        )
+        self.air_service = air_service or AirQualityService(
+            cache=self.cache, quota=quota, priority=PRIORITY_DIGEST, clock=clock, session=session
+        )
+        self.dust_service = dust_service or DustForecastService(
+            cache=self.cache, quota=quota, priority=PRIORITY_DIGEST, clock=clock, session=session
+        )
+
+    def _warm(self, kind, targets, cache_key, base, fetch):
+        report = {"total": len(targets), "cached": 0, "fetched": 0, "failed": []}
+        for target in targets:
+            if self.cache.has(kind, cache_key(target), base):
+                report["cached"] += 1
+                continue
+
+            # 한도 거부 시 서비스는 이전 발표를 돌려주므로, 이번 발표가 캐시에 들어갔는지로 판단
+            fetch(target)
+            if self.cache.has(kind, cache_key(target), base):
+                report["fetched"] += 1
+            else:
+                report["failed"].append(target)
+
+        available = report["cached"] + report["fetched"]
+        report["coverage"] = available / report["total"] if report["total"] else 1.0
+        return report
+
+    def warm_village(self):
+        base_date, base_time = self.weather_service._get_base_time()
+        return self._warm(
+            "village",
+            distinct_cells(self.subscribers),
+            lambda cell: f"{cell[0]},{cell[1]}",
+            f"{base_date}{base_time}",
+            lambda cell: self.weather_service.get_daily_forecast(*cell),
+        )
+
+    def warm_ultra_short(self):
+        base_date, base_time = self.ultra_service._get_base_time()
+        return self._warm(
+            "ultra_short",
+            distinct_cells(self.subscribers),
+            lambda cell: f"{cell[0]},{cell[1]}",
+            f"{base_date}{base_time}",
+            lambda cell: self.ultra_service.get_forecast(*cell),
+        )
+
+    def warm_air_quality(self):
+        return self._warm(
+            "air_quality",
+            distinct_stations(self.subscribers),
+            lambda station: station,
+            self.air_service._get_base_time(),
+            self.air_service.get_air_quality,
+        )
+
+    def warm_dust_forecast(self):
+        return self._warm(
+            "dust_forecast",
+            ["national"],
+            lambda target: target,
+            self.dust_service._get_base_time(),
+            lambda target: self.dust_service.get_index(),
+        )
+
+    def warm(self, kinds=KINDS):
+        warmers = {
+            "village": self.warm_village,
+            "ultra_short": self.warm_ultra_short,
+            "air_quality": self.warm_air_quality,
+            "dust_forecast": self.warm_dust_forecast,
+        }
+
+        reports = {}
+        for kind in kinds:
+            reports[kind] = warmers[kind]()
+        self.cache.save()
+
+        for kind, report in reports.items():
+            logger.info(
+                f"[{kind}] coverage {report['coverage']:.0%} "
+                f"({report['cached']} cached, {report['fetched']} fetched, "
+                f"{len(report['failed'])} failed / {report['total']})"
+            )
+            if report["failed"]:
+                logger.warning(f"[{kind}] failed targets: {report['failed']}")
+
+        if isinstance(self.session, HedgedSession):
+            logger.info(f"Hedged requests: {self.session.stats()}")
+
+        return reports
+
+
+if __name__ == "__main__":
+    kinds = sys.argv[1:] or KINDS
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        print(f"알 수 없는 종류: {', '.join(unknown)} (사용 가능: {', '.join(KINDS)})")
+        sys.exit(1)
+
+    CacheWarmer().warm(kinds)
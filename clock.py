@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+
+class SimulatedClock:
+    """시뮬레이션/재현용 시계 - advance()로만 시간이 흐름"""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def advance(self, **kwargs):
+        self.current += timedelta(**kwargs)
+        return self.current
+
+
+SYSTEM_CLOCK = SystemClock()
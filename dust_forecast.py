@@ -0,0 +1,142 @@
+import requests
+from datetime import datetime, timedelta
+import logging
+import os
+from dotenv import load_dotenv
+from quota import PRIORITY_ALERT
+from single_flight import SingleFlight, flight_key
+from clock import SYSTEM_CLOCK
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INFORM_CODES = {"PM10": "pm10", "PM25": "pm25"}
+
+
+def parse_inform_grade(text):
+    """"서울 : 보통,제주 : 좋음,..." → {"서울": "보통", "제주": "좋음", ...}"""
+    grades = {}
+    for part in (text or "").split(","):
+        if ":" not in part:
+            continue
+        region, grade = part.split(":", 1)
+        grades[region.strip()] = grade.strip()
+    return grades
+
+
+class DustForecastService:
+    """에어코리아 미세먼지 예보 - 전국 권역 예보가 한 번에 오므로 발표당 한 번만 호출
+
+    발표: 05, 11, 17, 23시. 캐시에는 {PM10/PM25: {예보일(YYYY-MM-DD): {권역: 등급}}} 형태로 저장
+    """
+
+    flight = SingleFlight()
+
+    def __init__(self, service_key=None, cache=None, quota=None, priority=PRIORITY_ALERT,
+                 clock=None, session=None):
+        self.service_key = service_key or os.getenv("AIRKOREA_SERVICE_KEY")
+        self.base_url = "https://apis.data.go.kr/B552584/ArpltnInforInqireSvc/getMinuDustFrcstDspth"
+        self.cache = cache
+        self.quota = quota
+        self.priority = priority
+        self.clock = clock or SYSTEM_CLOCK
+        self.session = session or requests
+        self.base_times = ["05", "11", "17", "23"]
+
+    def _get_base_time(self):
+        """예보 발표 후 ~30분 후 반영 - YYYYMMDDHH"""
+        now = self.clock.now() - timedelta(minutes=30)
+        for bt in reversed(self.base_times):
+            if now.hour >= int(bt):
+                return now.strftime("%Y%m%d") + bt
+
+        yesterday = now - timedelta(days=1)
+        return yesterday.strftime("%Y%m%d") + "23"
+
+    def get_index(self):
+        if not self.service_key:
+            logger.error("AIRKOREA_SERVICE_KEY is missing.")
+            return None
+
+        base = self._get_base_time()
+        return self.flight.do(flight_key(self, base), self._get_index, base)
+
+    def _get_index(self, base):
+        if self.cache:
+            cached = self.cache.get("dust_forecast", "national", base)
+            if cached is not None:
+                return cached
+
+        if self.quota and not self.quota.acquire(self.service_key, "getMinuDustFrcstDspth", self.priority):
+            return self.cache.get_latest("dust_forecast", "national")[0] if self.cache else None
+
+        index = self._fetch_index(base)
+        if index is not None and self.cache:
+            self.cache.put("dust_forecast", "national", base, index)
+        return index
+
+    def _fetch_index(self, base):
+        params = {
+            "serviceKey": self.service_key,
+            "returnType": "json",
+            "numOfRows": "100",
+            "pageNo": "1",
+            "searchDate": datetime.strptime(base[:8], "%Y%m%d").strftime("%Y-%m-%d"),
+            "ver": "1.1"
+        }
+
+        try:
+            response = self.session.get(self.base_url, params=params, timeout=15)
+            response.raise_for_status()
+            data = response.json()
+
+            items = data.get("response", {}).get("body", {}).get("items", [])
+            if not items:
+                logger.error(f"No dust forecast found for {params['searchDate']}")
+                return None
+
+            # 같은 날 여러 번 발표된 예보가 함께 오므로 예보일별로 가장 최근 발표만 사용
+            latest = {}
+            for item in items:
+                code = item.get("informCode")
+                if code not in INFORM_CODES:
+                    continue
+                key = (code, item.get("informData"))
+                if key not in latest or item.get("dataTime", "") > latest[key].get("dataTime", ""):
+                    latest[key] = item
+
+            index = {}
+            for (code, inform_date), item in latest.items():
+                index.setdefault(code, {})[inform_date] = parse_inform_grade(item.get("informGrade"))
+            return index
+
+        except Exception as e:
+            logger.error(f"Error fetching dust forecast: {e}")
+            return None
+
+    def get_outlook(self, region="서울"):
+        """권역의 오늘/내일 예보 등급 - {"today": {"pm10", "pm25"}, "tomorrow": {...}}"""
+        index = self.get_index()
+        if not index:
+            return None
+
+        now = self.clock.now()
+        outlook = {}
+        for day, date in (("today", now), ("tomorrow", now + timedelta(days=1))):
+            inform_date = date.strftime("%Y-%m-%d")
+            outlook[day] = {
+                field: index.get(code, {}).get(inform_date, {}).get(region)
+                for code, field in INFORM_CODES.items()
+            }
+        return outlook
+
+
+if __name__ == "__main__":
+    service = DustForecastService()
+    outlook = service.get_outlook("서울")
+    if outlook:
+        for day, label in (("today", "오늘"), ("tomorrow", "내일")):
+            grades = outlook[day]
+            print(f"{label}: 미세먼지 {grades['pm10'] or '-'} / 초미세먼지 {grades['pm25'] or '-'}")
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = "forecast_cache.json"
+
+
+class ForecastCache:
+    """발표 시각(base) 단위 로컬 캐시 - 같은 base의 데이터만 유효, 새 발표가 들어오면 덮어씀"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._dirty = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load forecast cache: {e}")
+            return {}
+
+    def _entry_key(self, kind, key):
+        return f"{kind}:{key}"
+
+    def get(self, kind, key, base):
+        with self._lock:
+            entry = self._entries.get(self._entry_key(kind, key))
+            if entry and entry["base"] == base:
+                self.hits += 1
+                return entry["value"]
+            self.misses += 1
+        return None
+
+    def has(self, kind, key, base):
+        """해당 발표의 데이터가 있는지 (적중/미스 집계 없음)"""
+        with self._lock:
+            entry = self._entries.get(self._entry_key(kind, key))
+        return entry is not None and entry["base"] == base
+
+    def get_latest(self, kind, key):
+        """발표 시각과 무관하게 마지막으로 저장된 (값, 발표시각) - 새 호출을 보류할 때 대체용, 없으면 (None, None)"""
+        with self._lock:
+            entry = self._entries.get(self._entry_key(kind, key))
+        return (entry["value"], entry["base"]) if entry else (None, None)
+
+    def put(self, kind, key, base, value):
+        with self._lock:
+            entry_key = self._entry_key(kind, key)
+            self._entries[entry_key] = {"base": base, "value": value}
+            self._dirty.add(entry_key)
+
+    def save(self):
+        """다른 프로세스(워커)가 저장한 항목을 지우지 않도록 디스크 내용과 병합 후 저장"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock, open(f"{self.path}.lock", "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            entries = self._load()
+            entries.update({key: self._entries[key] for key in self._dirty})
+            self._entries = entries
+            self._dirty.clear()
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
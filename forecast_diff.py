@@ -0,0 +1,102 @@
+import re
+from datetime import datetime, timedelta
+
+NEW_EVENT = "new_event"
+ONSET_SHIFT = "onset_shift"
+INTENSITY_JUMP = "intensity_jump"
+TYPE_CHANGE = "type_change"
+CLEARED = "cleared"
+
+# 알림을 새로 보낼 만한 변화 (CLEARED는 상태만 초기화)
+MATERIAL_CHANGES = {NEW_EVENT, ONSET_SHIFT, INTENSITY_JUMP, TYPE_CHANGE}
+
+# 기상청 강수 강도 구분 (1시간 강수량 mm 하한): 약한 비 / 보통 비 / 강한 비 / 매우 강한 비
+RAIN_INTENSITY_LEVELS = [0.1, 3.0, 15.0, 30.0]
+
+
+def parse_rn1(value):
+    """초단기예보 RN1 문자열("강수없음", "1mm 미만", "30.0~50.0mm", "50.0mm 이상")을 mm로 변환"""
+    if not value or "없음" in value:
+        return 0.0
+    if "미만" in value:
+        return 0.5
+    match = re.search(r"\d+(\.\d+)?", value)
+    return float(match.group()) if match else 0.0
+
+
+def rain_intensity(rn1_mm):
+    return sum(1 for level in RAIN_INTENSITY_LEVELS if rn1_mm >= level)
+
+
+def _entry_datetime(entry):
+    return datetime.strptime(f"{entry['date']}{entry['time']}", "%Y%m%d%H%M")
+
+
+def snapshot_ultra_short(forecast, now):
+    """초단기예보 → {onset, type, intensity} 요약 (현재 진행 중인 시간대 포함)"""
+    onset = None
+    rain_type = None
+    intensity = 0
+    for entry in sorted(forecast, key=_entry_datetime):
+        if _entry_datetime(entry) <= now - timedelta(hours=1) or not entry.get("pty_text"):
+            continue
+        if onset is None:
+            onset = _entry_datetime(entry)
+            rain_type = entry["pty_text"]
+        intensity = max(intensity, rain_intensity(parse_rn1(entry.get("rn1"))))
+
+    return {
+        "onset": onset.isoformat() if onset else None,
+        "type": rain_type,
+        "intensity": intensity,
+    }
+
+
+def snapshot_village(forecast, now, hours=3):
+    """단기예보 → 향후 hours 시간의 {onset, type, intensity} 요약 (강수형태 있음 또는 강수확률 60% 이상)"""
+    until = now + timedelta(hours=hours)
+    for entry in forecast["hourly"] + forecast["tomorrow"]:
+        fcst_datetime = _entry_datetime(entry)
+        if not now - timedelta(hours=1) < fcst_datetime <= until:
+            continue
+        if entry.get("pty", "0") != "0" or entry.get("pop", 0) >= 60:
+            rain_type = entry.get("pty_text")
+            return {
+                "onset": fcst_datetime.isoformat(),
+                "type": rain_type if rain_type not in (None, "없음") else "비",
+                "intensity": 0,
+            }
+    return {"onset": None, "type": None, "intensity": 0}
+
+
+def diff_snapshots(previous, current, now, shift_minutes=30):
+    """이전 요약 대비 변화 분류 - 이미 시작된 강수가 이어지는 경우는 변화로 보지 않음"""
+    previous_onset = datetime.fromisoformat(previous["onset"]) if previous and previous.get("onset") else None
+    current_onset = datetime.fromisoformat(current["onset"]) if current.get("onset") else None
+
+    if previous_onset is None and current_onset is None:
+        return []
+    if previous_onset is None:
+        return [{"type": NEW_EVENT, "onset": current["onset"]}]
+    if current_onset is None:
+        return [{"type": CLEARED, "onset": previous["onset"]}]
+
+    changes = []
+    if previous_onset <= now:
+        if current_onset > now + timedelta(hours=1):
+            return [{"type": NEW_EVENT, "onset": current["onset"]}]
+    else:
+        shift = (current_onset - previous_onset).total_seconds() / 60
+        if abs(shift) >= shift_minutes:
+            changes.append({"type": ONSET_SHIFT, "onset": current["onset"], "minutes": int(shift)})
+
+    if current["intensity"] > previous.get("intensity", 0):
+        changes.append({"type": INTENSITY_JUMP, "from": previous.get("intensity", 0), "to": current["intensity"]})
+    if current["type"] != previous.get("type"):
+        changes.append({"type": TYPE_CHANGE, "from": previous.get("type"), "to": current["type"]})
+
+    return changes
+
+
+def is_material(changes):
+    return any(change["type"] in MATERIAL_CHANGES for change in changes)
@@ -0,0 +1,165 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from quota import PRIORITY_POLL
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LATENCY_FILE = "hedge_latency.db"
+
+
+class HedgedSession:
+    """응답이 엔드포인트별 지연시간 백분위(기본 p95)를 넘기면 같은 요청을 한 번 더 보내고 먼저 온 응답 사용
+
+    hedge 비율은 최근 window건 요청 대비 max_hedge_ratio로 제한하며(최소 1건), quota가 있으면 hedge 호출도
+    가장 낮은 우선순위로 기록. 지연시간 표본과 요청/hedge 기록은 latency_file(SQLite)에 남겨
+    요청이 몇 번 안 되는 cron 실행끼리 공유
+    """
+
+    def __init__(self, session=None, percentile=95, window=200, min_samples=20,
+                 max_hedge_ratio=0.1, quota=None, max_workers=16, latency_file=LATENCY_FILE):
+        self.session = session or requests
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.quota = quota
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(latency_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS latencies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                endpoint TEXT NOT NULL,
+                seconds REAL NOT NULL
+            )"""
+        )
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hedged INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._latencies = self._load_latencies()
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def _endpoint(self, url):
+        return url.rsplit("/", 1)[-1]
+
+    def _load_latencies(self):
+        latencies = {}
+        for endpoint, seconds in self.conn.execute("SELECT endpoint, seconds FROM latencies ORDER BY id"):
+            latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+        return latencies
+
+    def _record_latency(self, endpoint, seconds):
+        with self._lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self.conn.execute("INSERT INTO latencies (endpoint, seconds) VALUES (?, ?)", (endpoint, seconds))
+            # 엔드포인트별 최근 window개만 유지
+            self.conn.execute(
+                """DELETE FROM latencies WHERE endpoint = ? AND id <= (
+                       SELECT id FROM latencies WHERE endpoint = ? ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+                (endpoint, endpoint, self.window),
+            )
+
+    def _record_request(self):
+        """요청 기록 후 id 반환 - 최근 window건만 유지"""
+        with self._lock:
+            self.requests += 1
+            request_id = self.conn.execute("INSERT INTO requests DEFAULT VALUES").lastrowid
+            self.conn.execute("DELETE FROM requests WHERE id <= ?", (request_id - self.window,))
+        return request_id
+
+    def threshold(self, endpoint):
+        """hedge 시작 기준 (초) - 표본이 부족하면 None (hedge 안 함)"""
+        with self._lock:
+            samples = sorted(self._latencies.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return samples[index]
+
+    def _can_hedge(self, request_id, endpoint, params):
+        """최근 요청 대비 hedge 비율이 남아 있으면 이 요청을 hedge로 표시 (실행끼리 합산, 최소 1건 허용)"""
+        with self._lock:
+            requests_seen, hedged = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hedged), 0) FROM requests"
+            ).fetchone()
+            if hedged >= max(1, requests_seen * self.max_hedge_ratio):
+                return False
+            self.conn.execute("UPDATE requests SET hedged = 1 WHERE id = ?", (request_id,))
+
+        if self.quota:
+            service_key = (params or {}).get("serviceKey")
+            if not self.quota.acquire(service_key, endpoint, PRIORITY_POLL):
+                with self._lock:
+                    self.conn.execute("UPDATE requests SET hedged = 0 WHERE id = ?", (request_id,))
+                return False
+        return True
+
+    def _timed_get(self, endpoint, url, params, timeout):
+        # 타임아웃/연결 오류도 걸린 시간만큼 기록해야 꼬리 지연이 백분위에 반영됨
+        start = time.monotonic()
+        try:
+            return self.session.get(url, params=params, timeout=timeout)
+        finally:
+            self._record_latency(endpoint, time.monotonic() - start)
+
+    def get(self, url, params=None, timeout=None):
+        endpoint = self._endpoint(url)
+        request_id = self._record_request()
+
+        primary = self._executor.submit(self._timed_get, endpoint, url, params, timeout)
+        threshold = self.threshold(endpoint)
+        if threshold is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._can_hedge(request_id, endpoint, params):
+            return primary.result()
+
+        with self._lock:
+            self.hedges_fired += 1
+        logger.info(f"Hedging {endpoint} request after {threshold:.2f}s")
+        hedge = self._executor.submit(self._timed_get, endpoint, url, params, timeout)
+
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                if future is hedge:
+                    with self._lock:
+                        self.hedges_won += 1
+                return future.result()
+        raise error
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "requests": self.requests,
+                "hedges_fired": self.hedges_fired,
+                "hedges_won": self.hedges_won,
+            }
+            endpoints = list(self._latencies)
+        stats["thresholds"] = {endpoint: self.threshold(endpoint) for endpoint in endpoints}
+        return stats
+
+
+def default_session(quota=None):
+    """HEDGE_REQUESTS=1이면 hedge 세션, 아니면 None (서비스 기본값 requests 사용)"""
+    if os.getenv("HEDGE_REQUESTS") == "1":
+        return HedgedSession(quota=quota)
+    return None
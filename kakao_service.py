@@ -1,20 +1,32 @@
 import requests
+import hashlib
 import json
 import os
 import logging
 from dotenv import load_dotenv
+from quota import PRIORITY_ALERT
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 친구에게 보내기 API 한 번에 보낼 수 있는 최대 수신자 수
+FRIENDS_BATCH_SIZE = 5
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 class KakaoTalkService:
-    def __init__(self):
+    def __init__(self, quota=None, priority=PRIORITY_ALERT):
         self.token_file = "kakao_tokens.json"
         self.rest_api_key = os.getenv("KAKAO_REST_API_KEY")
         self.client_secret = os.getenv("KAKAO_CLIENT_SECRET")
         self.tokens = self._load_tokens()
+        self.quota = quota
+        self.priority = priority
 
     def _load_tokens(self):
         if os.path.exists(self.token_file):
@@ -55,16 +67,7 @@ class KakaoTalkService:
             logger.error(f"Failed to refresh Kakao token: {e}")
             return False
 
-    def send_me_message(self, text, web_url="https://www.weather.go.kr"):
-        if not self.tokens:
-            logger.error("Tokens not found. Please authenticate first.")
-            return False
-
-        url = "https://kapi.kakao.com/v2/api/talk/memo/default/send"
-        headers = {
-            "Authorization": f"Bearer {self.tokens['access_token']}"
-        }
-        
+    def _template(self, text, web_url):
         template_object = {
             "object_type": "text",
             "text": text,
@@ -74,11 +77,13 @@ class KakaoTalkService:
             },
             "button_title": "날씨 상세보기"
         }
-        
-        data = {
-            "template_object": json.dumps(template_object)
-        }
+        return json.dumps(template_object)
 
+    def _post(self, url, data):
+        """토큰 만료(401) 시 한 번 갱신 후 재시도 - 갱신 실패 시 None"""
+        headers = {
+            "Authorization": f"Bearer {self.tokens['access_token']}"
+        }
         response = requests.post(url, headers=headers, data=data)
         
         if response.status_code == 401:
@@ -87,7 +92,26 @@ class KakaoTalkService:
                 headers["Authorization"] = f"Bearer {self.tokens['access_token']}"
                 response = requests.post(url, headers=headers, data=data)
             else:
-                return False
+                return None
+        return response
+
+    def send_me_message(self, text, web_url="https://www.weather.go.kr"):
+        if not self.tokens:
+            logger.error("Tokens not found. Please authenticate first.")
+            return False
+
+        url = "https://kapi.kakao.com/v2/api/talk/memo/default/send"
+        data = {
+            "template_object": self._template(text, web_url)
+        }
+
+        if self.quota and not self.quota.acquire(self.rest_api_key, "talk_memo", self.priority):
+            logger.error("Kakao send quota exhausted. Message deferred.")
+            return False
+
+        response = self._post(url, data)
+        if response is None:
+            return False
 
         if response.status_code == 200:
             logger.info("Message sent successfully.")
@@ -96,6 +120,92 @@ class KakaoTalkService:
             logger.error(f"Failed to send message: {response.text}")
             return False
 
+    def send_friends_message(self, text, receiver_uuids, web_url="https://www.weather.go.kr"):
+        """같은 메시지를 친구 UUID 목록에 FRIENDS_BATCH_SIZE명씩 묶어 발송
+
+        반환: (성공한 UUID 목록, {실패한 UUID: 오류 메시지})
+        """
+        if not self.tokens:
+            logger.error("Tokens not found. Please authenticate first.")
+            return [], {uuid: "no tokens" for uuid in receiver_uuids}
+
+        url = "https://kapi.kakao.com/v1/api/talk/friends/message/default/send"
+        template_object = self._template(text, web_url)
+        succeeded = []
+        failed = {}
+
+        for i in range(0, len(receiver_uuids), FRIENDS_BATCH_SIZE):
+            batch = receiver_uuids[i:i + FRIENDS_BATCH_SIZE]
+            if self.quota and not self.quota.acquire(self.rest_api_key, "talk_friends", self.priority):
+                logger.error("Kakao friends send quota exhausted. Messages deferred.")
+                failed.update({uuid: "quota exhausted" for uuid in receiver_uuids[i:]})
+                break
+
+            data = {
+                "receiver_uuids": json.dumps(batch),
+                "template_object": template_object,
+            }
+            response = self._post(url, data)
+            if response is None or response.status_code != 200:
+                error = response.text if response is not None else "token refresh failed"
+                logger.error(f"Failed to send friends message to {len(batch)} receivers: {error}")
+                failed.update({uuid: error for uuid in batch})
+                continue
+
+            result = response.json()
+            succeeded.extend(result.get("successful_receiver_uuids", []))
+            # 일부 수신자만 실패하면 failure_info에 오류별로 UUID 목록이 옴
+            for failure in result.get("failure_info", []):
+                for uuid in failure.get("receiver_uuids", []):
+                    failed[uuid] = f"{failure.get('code')}: {failure.get('msg')}"
+
+        logger.info(f"Friends message sent to {len(succeeded)}/{len(receiver_uuids)} receivers.")
+        return succeeded, failed
+
+    def send_outbox(self, outbox, user_ids=None, kind=None):
+        """outbox의 미발송 메시지(user_ids/kind로 범위 지정)를 발송하고 결과 기록 - 발송 성공 개수 반환
+
+        수신자(친구 UUID)가 있는 메시지는 내용이 같은 것끼리 묶어 친구에게 보내기로 한 번에 발송.
+        같은 수신자에게 같은 내용이 여러 건이면(발표시각만 다른 비 알림 등) 한 번만 보내고 나머지는 superseded
+        """
+        memo_groups = {}
+        friend_groups = {}
+        for message in outbox.pending(user_ids, kind):
+            if not outbox.claim(message["key"]):
+                continue
+
+            text_hash = content_hash(message["text"])
+            if message["receiver"]:
+                receivers = friend_groups.setdefault(text_hash, (message["text"], {}))[1]
+                receivers.setdefault(message["receiver"], []).append(message["key"])
+            else:
+                memo_groups.setdefault(text_hash, (message["text"], []))[1].append(message["key"])
+
+        delivered = 0
+        for text, keys in memo_groups.values():
+            if self.send_me_message(text):
+                delivered += self._mark_sent(outbox, keys)
+            else:
+                for key in keys:
+                    outbox.mark_failed(key, "send failed")
+
+        for text, receivers in friend_groups.values():
+            succeeded, failed = self.send_friends_message(text, list(receivers))
+            for uuid, keys in receivers.items():
+                if uuid in succeeded:
+                    delivered += self._mark_sent(outbox, keys)
+                else:
+                    for key in keys:
+                        outbox.mark_failed(key, failed.get(uuid, "no result"))
+        return delivered
+
+    def _mark_sent(self, outbox, keys):
+        first, *duplicates = keys
+        outbox.mark_delivered(first)
+        for key in duplicates:
+            outbox.mark_superseded(key)
+        return 1
+
 if __name__ == "__main__":
     service = KakaoTalkService()
     if service.tokens:
@@ -1,10 +1,17 @@
 import logging
 import os
-from datetime import datetime
 from dotenv import load_dotenv
 from weather import WeatherService
+from ultra_short_forecast import UltraShortForecastService
+from timeline import TimelineService
+from dust_forecast import DustForecastService
 from air_quality import AirQualityService
 from kakao_service import KakaoTalkService
+from forecast_cache import ForecastCache
+from quota import QuotaLedger, PRIORITY_DIGEST
+from clock import SYSTEM_CLOCK
+from hedging import default_session
+from outbox import Outbox
 
 load_dotenv()
 
@@ -45,14 +52,17 @@ SEASONAL_ITEMS = {
 
 
 class SmartWeatherAdvisor:
-    def __init__(self, forecast: dict, air_quality: dict | None = None, gender: str = "male"):
+    def __init__(self, forecast: dict, air_quality: dict | None = None, gender: str = "male", clock=None,
+                 dust_outlook: dict | None = None):
         self.forecast = forecast
         self.hourly = forecast.get("hourly", [])
         self.tomorrow = forecast.get("tomorrow", [])
         self.min_temp = forecast.get("min_temp")
         self.max_temp = forecast.get("max_temp")
         self.air_quality = air_quality
+        self.dust_outlook = dust_outlook or {}
         self.gender = gender.lower() if gender else "male"
+        self.clock = clock or SYSTEM_CLOCK
     
     def _get_temp_category(self, temp: int) -> str:
         if temp <= -5:
@@ -77,7 +87,11 @@ class SmartWeatherAdvisor:
         for h in hours:
             pty = h.get("pty", "0")
             pop = h.get("pop", 0)
-            if pty != "0" or pop >= 60:
+            # 초단기예보로 덮어쓴 시간대는 강수형태만 사용 (발표가 더 최근이라 강수확률보다 정확)
+            if h.get("sources", {}).get("pty", {}).get("source") == "ultra_short":
+                if pty != "0":
+                    rain_hours.append(h)
+            elif pty != "0" or pop >= 60:
                 rain_hours.append(h)
         return rain_hours
     
@@ -90,7 +104,7 @@ class SmartWeatherAdvisor:
             return f"오후 {hour - 12}시"
     
     def _get_rain_advice(self) -> str | None:
-        now_hour = datetime.now().hour
+        now_hour = self.clock.now().hour
         future_hours = [h for h in self.hourly if h["hour"] > now_hour]
         rain_hours = self._find_rain_hours(future_hours)
         
@@ -138,17 +152,24 @@ class SmartWeatherAdvisor:
         return None
     
     def _get_air_quality_advice(self) -> str | None:
-        if not self.air_quality:
+        """현재 측정값 + 오늘 예보 등급 중 나쁜 쪽 기준, 오늘은 괜찮고 내일 나쁘면 내일 안내"""
+        if not self.air_quality and not self.dust_outlook:
             return None
         
-        pm10_grade = self.air_quality.get("pm10_grade", "")
-        pm25_grade = self.air_quality.get("pm25_grade", "")
+        air = self.air_quality or {}
+        current = [air.get("pm10_grade", ""), air.get("pm25_grade", "")]
+        today = [g for g in self.dust_outlook.get("today", {}).values() if g]
+        tomorrow = [g for g in self.dust_outlook.get("tomorrow", {}).values() if g]
         
-        if "매우나쁨" in (pm10_grade, pm25_grade):
+        if "매우나쁨" in current + today:
             return "미세먼지 최악! 외출 자제하고 마스크 필수! 😷"
-        elif "나쁨" in (pm10_grade, pm25_grade):
+        elif "나쁨" in current:
             return "미세먼지 나쁨, 마스크 챙겨! 😷"
-        elif pm10_grade == "좋음" and pm25_grade == "좋음":
+        elif "나쁨" in today:
+            return "오늘 미세먼지 나빠진대, 마스크 챙겨! 😷"
+        elif {"나쁨", "매우나쁨"} & set(tomorrow):
+            return "내일은 미세먼지 나쁨 예보, 마스크 미리 챙겨둬! 😷"
+        elif current == ["좋음", "좋음"] and all(g == "좋음" for g in today):
             return "공기 좋아! 환기하기 좋은 날 🌬️"
         
         return None
@@ -183,8 +204,8 @@ class SmartWeatherAdvisor:
         return advices
 
 
-def format_hourly_forecast(hourly: list) -> str:
-    now_hour = datetime.now().hour
+def format_hourly_forecast(hourly: list, clock=SYSTEM_CLOCK) -> str:
+    now_hour = clock.now().hour
     future_hours = [h for h in hourly if h["hour"] >= now_hour][:8]
     
     lines = []
@@ -221,26 +242,15 @@ def format_air_quality(air: dict | None) -> str:
     return f"미세먼지 {pm10}㎍/㎥ {pm10_grade}{pm10_emoji} | 초미세 {pm25}㎍/㎥ {pm25_grade}{pm25_emoji}"
 
 
-def main():
-    gender = os.getenv("GENDER", "male")
-    
-    weather_service = WeatherService()
-    forecast = weather_service.get_daily_forecast()
-    
-    if not forecast:
-        logger.error("Failed to fetch weather data.")
-        return
-
-    air_service = AirQualityService()
-    air_quality = air_service.get_air_quality("중구")
-
-    advisor = SmartWeatherAdvisor(forecast, air_quality, gender)
+def build_message(forecast: dict, air_quality: dict | None, gender: str = "male", location: str = "서울",
+                  clock=SYSTEM_CLOCK, dust_outlook: dict | None = None) -> str:
+    advisor = SmartWeatherAdvisor(forecast, air_quality, gender, clock, dust_outlook)
     advices = advisor.generate_advice()
     
     date_str = forecast["date"]
     formatted_date = f"{date_str[4:6]}월 {date_str[6:8]}일"
     
-    hourly_text = format_hourly_forecast(forecast["hourly"])
+    hourly_text = format_hourly_forecast(forecast["hourly"], clock)
     
     temp_range = ""
     if forecast["min_temp"] and forecast["max_temp"]:
@@ -250,9 +260,9 @@ def main():
     
     advice_text = "\n".join(advices) if advices else "오늘 하루도 화이팅! 💪"
     
-    message = f"""{advice_text}
+    return f"""{advice_text}
 
-📍 서울 | 📅 {formatted_date}
+📍 {location} | 📅 {formatted_date}
 
 {temp_range}
 🌫️ {air_text}
@@ -260,10 +270,44 @@ def main():
 ⏰ 시간별 예보
 {hourly_text}"""
 
-    kakao_service = KakaoTalkService()
-    success = kakao_service.send_me_message(message)
+
+def main():
+    gender = os.getenv("GENDER", "male")
+    cache = ForecastCache()
+    quota = QuotaLedger()
+    session = default_session(quota)
+    outbox = Outbox()
+    kakao_service = KakaoTalkService(quota=quota, priority=PRIORITY_DIGEST)
+
+    # 이전 실행이 중간에 멈췄다면 남은 메시지만 보내고, 오늘 메시지를 이미 만들었으면 API를 다시 호출하지 않음
+    if kakao_service.send_outbox(outbox, ["me"], "digest"):
+        logger.info("Resumed undelivered messages from outbox.")
+    today = SYSTEM_CLOCK.now().strftime("%Y%m%d")
+    if outbox.exists("me", today, "digest"):
+        logger.info("Today's weather update is already in the outbox.")
+        return
+    
+    weather_service = WeatherService(cache=cache, quota=quota, priority=PRIORITY_DIGEST, session=session)
+    ultra_service = UltraShortForecastService(cache=cache, quota=quota, priority=PRIORITY_DIGEST, session=session)
+    timeline = TimelineService(weather_service, ultra_service).get_timeline()
+    
+    if not timeline or not timeline.village_base:
+        logger.error("Failed to fetch weather data.")
+        return
+    forecast = timeline.daily_forecast()
+
+    air_service = AirQualityService(cache=cache, quota=quota, priority=PRIORITY_DIGEST, session=session)
+    air_quality = air_service.get_air_quality("중구")
+    dust_service = DustForecastService(cache=cache, quota=quota, priority=PRIORITY_DIGEST, session=session)
+    dust_outlook = dust_service.get_outlook("서울")
+
+    # 미세먼지 예보 인덱스 등 이번에 받은 데이터를 다음 실행/다른 흐름이 재사용하도록 저장
+    cache.save()
+
+    message = build_message(forecast, air_quality, gender, dust_outlook=dust_outlook)
+    outbox.enqueue("me", forecast["date"], "digest", forecast["base"], message)
     
-    if success:
+    if kakao_service.send_outbox(outbox, ["me"], "digest"):
         logger.info("Weather update sent successfully.")
     else:
         logger.error("Failed to send weather update.")
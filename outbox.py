@@ -0,0 +1,146 @@
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from clock import SYSTEM_CLOCK
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+OUTBOX_FILE = "outbox.db"
+
+# 종류별 유효시간 - 지난 메시지는 보내지 않음 (여기 없는 종류는 메시지 날짜가 끝날 때까지)
+MESSAGE_TTL = {
+    "rain": timedelta(hours=1),
+}
+
+
+def make_key(user_id, date, kind, base_time):
+    return f"{user_id}|{date}|{kind}|{base_time}"
+
+
+class Outbox:
+    """발송 전 메시지를 저장하는 SQLite outbox - 중단 후 재실행 시 미발송 메시지만 이어서 보냄
+
+    발송 직전 'sending'으로 선점하므로 여러 프로세스가 동시에 비워도 중복 발송되지 않음.
+    선점 후 stale_seconds 안에 완료되지 않은 메시지(발송 중 종료)는 다시 발송 대상이 됨 (최소 1회 발송).
+    유효시간(MESSAGE_TTL)이 지난 메시지는 'expired'로 바뀌고 발송하지 않음
+    """
+
+    def __init__(self, path=OUTBOX_FILE, max_attempts=5, stale_seconds=300, clock=None):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.stale_seconds = stale_seconds
+        self.clock = clock or SYSTEM_CLOCK
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS messages (
+                idempotency_key TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                base_time TEXT NOT NULL,
+                receiver TEXT,
+                expires_at TEXT,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_at REAL,
+                created_at TEXT NOT NULL,
+                delivered_at TEXT,
+                error TEXT
+            )"""
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(messages)")}
+        for column in ("receiver", "expires_at"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE messages ADD COLUMN {column} TEXT")
+
+    def _expires_at(self, kind, date):
+        if kind in MESSAGE_TTL:
+            return (self.clock.now() + MESSAGE_TTL[kind]).isoformat()
+        return (datetime.strptime(date, "%Y%m%d") + timedelta(days=1)).isoformat()
+
+    def enqueue(self, user_id, date, kind, base_time, text, receiver=None):
+        """같은 (사용자, 날짜, 종류, 발표시각) 메시지가 이미 있으면 무시하고 False
+
+        receiver는 카카오 친구 UUID (없으면 나에게 보내기)
+        """
+        cursor = self.conn.execute(
+            """INSERT OR IGNORE INTO messages
+               (idempotency_key, user_id, date, kind, base_time, receiver, text, created_at, expires_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (make_key(user_id, date, kind, base_time), user_id, date, kind, base_time, receiver, text,
+             self.clock.now().isoformat(), self._expires_at(kind, date)),
+        )
+        return cursor.rowcount == 1
+
+    def exists(self, user_id, date, kind):
+        row = self.conn.execute(
+            "SELECT 1 FROM messages WHERE user_id = ? AND date = ? AND kind = ? LIMIT 1",
+            (user_id, date, kind),
+        ).fetchone()
+        return row is not None
+
+    def expire(self):
+        """유효시간이 지난 미발송 메시지를 'expired'로 표시 (발송 중인 메시지는 제외)"""
+        cursor = self.conn.execute(
+            """UPDATE messages SET status = 'expired'
+               WHERE (status IN ('pending', 'failed') OR (status = 'sending' AND claimed_at < ?))
+                 AND COALESCE(expires_at, '') <= ?""",
+            (time.time() - self.stale_seconds, self.clock.now().isoformat()),
+        )
+        if cursor.rowcount:
+            logger.warning(f"{cursor.rowcount} outbox messages expired before delivery")
+
+    def pending(self, user_ids=None, kind=None):
+        """발송 대상 메시지 - user_ids/kind를 주면 해당 사용자/종류만 (다른 프로세스 몫은 건드리지 않음)"""
+        self.expire()
+        query = """SELECT idempotency_key, user_id, kind, receiver, text FROM messages
+                   WHERE ((status IN ('pending', 'failed') AND attempts < ?)
+                          OR (status = 'sending' AND claimed_at < ?))"""
+        params = [self.max_attempts, time.time() - self.stale_seconds]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        if user_ids is not None:
+            query += f" AND user_id IN ({', '.join('?' * len(user_ids))})"
+            params.extend(user_ids)
+        rows = self.conn.execute(query + " ORDER BY created_at", params).fetchall()
+        return [{"key": k, "user_id": u, "kind": kind, "receiver": r, "text": t} for k, u, kind, r, t in rows]
+
+    def claim(self, key):
+        cursor = self.conn.execute(
+            """UPDATE messages SET status = 'sending', claimed_at = ?, attempts = attempts + 1
+               WHERE idempotency_key = ? AND expires_at > ?
+                 AND ((status IN ('pending', 'failed') AND attempts < ?)
+                      OR (status = 'sending' AND claimed_at < ?))""",
+            (time.time(), key, self.clock.now().isoformat(), self.max_attempts, time.time() - self.stale_seconds),
+        )
+        return cursor.rowcount == 1
+
+    def mark_delivered(self, key):
+        self.conn.execute(
+            "UPDATE messages SET status = 'delivered', delivered_at = ?, error = NULL WHERE idempotency_key = ?",
+            (self.clock.now().isoformat(), key),
+        )
+
+    def mark_superseded(self, key):
+        """같은 수신자에게 같은 내용을 이미 보내 발송하지 않은 메시지"""
+        self.conn.execute(
+            "UPDATE messages SET status = 'superseded' WHERE idempotency_key = ?",
+            (key,),
+        )
+
+    def mark_failed(self, key, error=None):
+        self.conn.execute(
+            "UPDATE messages SET status = 'failed', error = ? WHERE idempotency_key = ?",
+            (error, key),
+        )
+
+    def stats(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall())
+
+    def close(self):
+        self.conn.close()
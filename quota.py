@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from clock import SYSTEM_CLOCK
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUOTA_FILE = "quota_ledger.db"
+
+PRIORITY_DIGEST = 0   # 아침 발송 (최우선)
+PRIORITY_ALERT = 1    # 비 알림 발송 등 일반 호출
+PRIORITY_POLL = 2     # 초단기예보 주기 확인 등 기회성 호출
+
+# 우선순위별로 남겨둬야 하는 일일 한도 비율 - 남은 호출이 이 비율 아래면 해당 우선순위 호출은 보류
+RESERVED_SHARE = {
+    PRIORITY_DIGEST: 0.0,
+    PRIORITY_ALERT: 0.1,
+    PRIORITY_POLL: 0.3,
+}
+
+# 엔드포인트별 일일 호출 한도 (data.go.kr 개발계정 기준, 운영계정 승인 시 조정)
+DAILY_LIMITS = {
+    "getVilageFcst": 10000,
+    "getUltraSrtFcst": 10000,
+    "getMsrstnAcctoRltmMesureDnsty": 500,
+    "getMinuDustFrcstDspth": 500,
+    "talk_memo": 30000,
+    "talk_friends": 30000,
+}
+
+
+def key_id(service_key):
+    """원본 키를 저장하지 않도록 짧은 해시로 식별"""
+    if not service_key:
+        return "none"
+    return hashlib.sha256(service_key.encode("utf-8")).hexdigest()[:12]
+
+
+class QuotaLedger:
+    """API 키/엔드포인트별 일일 호출 수 기록 및 우선순위 기반 예산 배분"""
+
+    def __init__(self, path=QUOTA_FILE, limits=None, clock=None):
+        self.path = path
+        self.clock = clock or SYSTEM_CLOCK
+        self.limits = {**DAILY_LIMITS, **(limits or {})}
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS calls (
+                day TEXT NOT NULL,
+                key_id TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                denied INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, key_id, endpoint, priority)
+            )"""
+        )
+
+    def _today(self):
+        return self.clock.now().strftime("%Y%m%d")
+
+    def _used(self, day, key, endpoint):
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(count), 0) FROM calls WHERE day = ? AND key_id = ? AND endpoint = ?",
+            (day, key, endpoint),
+        ).fetchone()
+        return row[0]
+
+    def acquire(self, service_key, endpoint, priority=PRIORITY_ALERT):
+        """호출 1회 예약 - 한도 내면 기록 후 True, 우선순위 예약분을 침범하면 False"""
+        day = self._today()
+        key = key_id(service_key)
+        limit = self.limits.get(endpoint)
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                used = self._used(day, key, endpoint)
+                allowed = limit is None or limit - used > limit * RESERVED_SHARE.get(priority, 0.0)
+                column = "count" if allowed else "denied"
+                self.conn.execute(
+                    f"""INSERT INTO calls (day, key_id, endpoint, priority, {column}) VALUES (?, ?, ?, ?, 1)
+                        ON CONFLICT (day, key_id, endpoint, priority) DO UPDATE SET {column} = {column} + 1""",
+                    (day, key, endpoint, priority),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        if not allowed:
+            logger.warning(f"Quota low for {endpoint} ({used}/{limit}). Deferring priority {priority} call.")
+        return allowed
+
+    def forecast(self, key, endpoint, now=None):
+        """지금까지의 호출 속도로 자정까지 사용량 추정 (key는 key_id() 값)"""
+        now = now or self.clock.now()
+        day = now.strftime("%Y%m%d")
+        with self._lock:
+            used = self._used(day, key, endpoint)
+        limit = self.limits.get(endpoint)
+
+        elapsed = (now - now.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds()
+        elapsed_share = max(elapsed / 86400, 1 / 24)
+        projected = int(used / elapsed_share)
+
+        return {
+            "endpoint": endpoint,
+            "used": used,
+            "limit": limit,
+            "remaining": None if limit is None else limit - used,
+            "projected": projected,
+            "will_exceed": limit is not None and projected > limit,
+        }
+
+    def report(self, day=None):
+        day = day or self._today()
+        with self._lock:
+            rows = self.conn.execute(
+                """SELECT key_id, endpoint, priority, count, denied FROM calls
+                   WHERE day = ? ORDER BY key_id, endpoint, priority""",
+                (day,),
+            ).fetchall()
+        return [
+            {"key_id": k, "endpoint": e, "priority": p, "count": c, "denied": d}
+            for k, e, p, c, d in rows
+        ]
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    ledger = QuotaLedger()
+    print(f"=== {ledger._today()} API 호출 현황 ===")
+    for row in ledger.report():
+        limit = ledger.limits.get(row["endpoint"], "-")
+        print(f"  [{row['key_id']}] {row['endpoint']} (우선순위 {row['priority']}): "
+              f"{row['count']}회 / 한도 {limit}, 보류 {row['denied']}회")
+
+    print("\n=== 자정까지 예상 사용량 ===")
+    for key, endpoint in sorted({(row["key_id"], row["endpoint"]) for row in ledger.report()}):
+        forecast = ledger.forecast(key, endpoint)
+        warning = " ⚠️ 한도 초과 예상" if forecast["will_exceed"] else ""
+        print(f"  [{key}] {endpoint}: {forecast['used']}회 사용, 예상 {forecast['projected']}회 / 한도 {forecast['limit']}{warning}")
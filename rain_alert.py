@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 import os
+import sys
 import json
 import logging
-from datetime import datetime
 from dotenv import load_dotenv
 from ultra_short_forecast import UltraShortForecastService
+from weather import WeatherService
 from kakao_service import KakaoTalkService
+from forecast_cache import ForecastCache
+from adaptive_polling import AdaptiveRainScheduler
+from quota import QuotaLedger, PRIORITY_POLL
+from clock import SYSTEM_CLOCK
+from hedging import default_session
+from outbox import Outbox
+from timeline import TimelineService
+from forecast_diff import snapshot_ultra_short, diff_snapshots, is_material, NEW_EVENT, CLEARED
 
 load_dotenv()
 
@@ -15,33 +24,23 @@ logger = logging.getLogger(__name__)
 ALERT_STATE_FILE = "rain_alert_state.json"
 
 
-def load_alert_state():
-    if os.path.exists(ALERT_STATE_FILE):
-        with open(ALERT_STATE_FILE, "r") as f:
+def load_alert_state(state_file=ALERT_STATE_FILE):
+    if os.path.exists(state_file):
+        with open(state_file, "r") as f:
             return json.load(f)
-    return {"last_alert_time": None, "last_alert_type": None}
+    return {"last_alert_time": None, "last_alert_type": None, "alerted": None}
 
 
-def save_alert_state(state):
-    with open(ALERT_STATE_FILE, "w") as f:
+def save_alert_state(state, state_file=ALERT_STATE_FILE):
+    with open(state_file, "w") as f:
         json.dump(state, f)
 
 
-def should_send_alert(rain_info, state):
-    if not state.get("last_alert_time"):
-        return True
-    
-    last_alert = datetime.fromisoformat(state["last_alert_time"])
-    now = datetime.now()
-    
-    hours_since_last = (now - last_alert).total_seconds() / 3600
-    if hours_since_last >= 3:
-        return True
-    
-    if state.get("last_alert_type") != rain_info["type"]:
-        return True
-    
-    return False
+def classify_changes(forecast, state, clock=SYSTEM_CLOCK):
+    """마지막으로 알린 예보(state["alerted"]) 대비 현재 초단기예보의 변화 분류"""
+    snapshot = snapshot_ultra_short(forecast, clock.now())
+    changes = diff_snapshots(state.get("alerted"), snapshot, clock.now())
+    return snapshot, changes
 
 
 def format_rain_alert(rain_info):
@@ -70,36 +69,94 @@ def format_rain_alert(rain_info):
     return message
 
 
-def check_and_alert(nx=60, ny=127):
-    forecast_service = UltraShortForecastService()
-    rain_info = forecast_service.check_upcoming_rain(nx, ny, within_minutes=60)
+def check_and_alert(nx=60, ny=127, state_file=ALERT_STATE_FILE, forecast_service=None, kakao_service=None,
+                    scheduler=None, clock=SYSTEM_CLOCK, outbox=None, user_id="me", recipients=None,
+                    timeline_service=None):
+    """recipients: 같은 격자 구독자의 (id, 친구 UUID) 목록 - 없으면 user_id에게 나에게 보내기
+
+    timeline_service를 주면 아침 발송과 같은 격자 Timeline의 초단기예보 구간 사용
+    """
+    outbox = outbox or Outbox()
+    kakao_service = kakao_service or KakaoTalkService(quota=QuotaLedger())
+    recipients = recipients or [(user_id, None)]
+    recipient_ids = [recipient_id for recipient_id, _ in recipients]
+    if kakao_service.send_outbox(outbox, recipient_ids, "rain"):
+        logger.info("Resumed undelivered messages from outbox.")
+
+    if scheduler and not scheduler.is_due(nx, ny):
+        logger.info(f"Low rain probability at {nx},{ny}. Skipping ultra short check.")
+        scheduler.save_state()
+        return False
+
+    forecast_service = forecast_service or UltraShortForecastService(
+        cache=ForecastCache(), quota=QuotaLedger(), priority=PRIORITY_POLL, clock=clock
+    )
+    timeline_service = timeline_service or TimelineService(ultra_service=forecast_service, clock=clock)
+    timeline = timeline_service.get_timeline(nx, ny)
+    forecast = timeline.ultra_short() if timeline else None
+    rain_info = None
+    if forecast:
+        rain_info = forecast_service.check_upcoming_rain(nx, ny, within_minutes=60, forecast=forecast)
+
+    if scheduler:
+        scheduler.record_check(nx, ny, rain_info)
+        scheduler.save_state()
+
+    if not forecast:
+        return False
+
+    state = load_alert_state(state_file)
+    snapshot, changes = classify_changes(forecast, state, clock)
     
     if not rain_info:
         logger.info("No rain detected in the next hour.")
+        # 알렸던 강수가 끝났거나 다른 강수로 바뀌면 다음 강수는 새 알림 대상
+        if state.get("alerted") and any(c["type"] in (NEW_EVENT, CLEARED) for c in changes):
+            state["alerted"] = None
+            save_alert_state(state, state_file)
         return False
     
-    state = load_alert_state()
-    
-    if not should_send_alert(rain_info, state):
-        logger.info(f"Rain detected ({rain_info['type']}) but alert was sent recently. Skipping.")
+    if not is_material(changes):
+        logger.info(f"Rain detected ({rain_info['type']}) but forecast unchanged since last alert. Skipping.")
         return False
+
+    logger.info(f"Forecast changes at {nx},{ny}: {changes}")
     
     message = format_rain_alert(rain_info)
     logger.info(f"Sending rain alert: {message}")
+
+    for recipient_id, receiver in recipients:
+        outbox.enqueue(recipient_id, clock.now().strftime("%Y%m%d"), "rain", timeline.ultra_base, message, receiver)
+
+    # outbox에 들어가면 발송은 재실행 시에도 이어지므로 상태를 먼저 기록 (같은 알림을 다시 만들지 않음)
+    state["last_alert_time"] = clock.now().isoformat()
+    state["last_alert_type"] = rain_info["type"]
+    state["alerted"] = snapshot
+    save_alert_state(state, state_file)
     
-    kakao_service = KakaoTalkService()
-    success = kakao_service.send_me_message(message)
-    
-    if success:
-        state["last_alert_time"] = datetime.now().isoformat()
-        state["last_alert_type"] = rain_info["type"]
-        save_alert_state(state)
+    if kakao_service.send_outbox(outbox, recipient_ids, "rain"):
         logger.info("Rain alert sent successfully.")
-        return True
     else:
-        logger.error("Failed to send rain alert.")
-        return False
+        logger.error("Failed to send rain alert. It stays in the outbox for the next run.")
+    return True
 
 
 if __name__ == "__main__":
-    check_and_alert()
+    if "--adaptive" in sys.argv[1:]:
+        cache = ForecastCache()
+        quota = QuotaLedger()
+        session = default_session(quota)
+        weather_service = WeatherService(cache=cache, quota=quota, priority=PRIORITY_POLL, session=session)
+        ultra_service = UltraShortForecastService(cache=cache, quota=quota, priority=PRIORITY_POLL, session=session)
+        scheduler = AdaptiveRainScheduler(weather_service)
+        check_and_alert(
+            forecast_service=ultra_service,
+            kakao_service=KakaoTalkService(quota=quota),
+            scheduler=scheduler,
+            timeline_service=TimelineService(weather_service, ultra_service),
+        )
+        # 다음 cron 실행이 같은 발표의 단기예보를 다시 호출하지 않도록 캐시 저장
+        cache.save()
+        logger.info(f"Adaptive polling report: {scheduler.report()}")
+    else:
+        check_and_alert()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+import argparse
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from weather import WeatherService
+from ultra_short_forecast import UltraShortForecastService
+from air_quality import AirQualityService
+from dust_forecast import DustForecastService
+from kakao_service import KakaoTalkService
+from forecast_cache import ForecastCache
+from subscribers import load_subscribers, rain_recipients
+from work_queue import WorkQueue
+from main import build_message
+from rain_alert import check_and_alert
+from adaptive_polling import AdaptiveRainScheduler
+from quota import QuotaLedger, PRIORITY_DIGEST, PRIORITY_ALERT, PRIORITY_POLL
+from hedging import default_session
+from outbox import Outbox
+from timeline import TimelineService
+from clock import SYSTEM_CLOCK
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("digest", "rain")
+
+# 작업 종류별 API 호출 우선순위 (weather/air, ultra_short, kakao)
+JOB_PRIORITIES = {
+    "digest": (PRIORITY_DIGEST, PRIORITY_ALERT, PRIORITY_DIGEST),
+    "rain": (PRIORITY_POLL, PRIORITY_POLL, PRIORITY_ALERT),
+}
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """격자(nx, ny) → 샤드 일관 해싱 - 샤드 수가 바뀌어도 대부분의 격자는 같은 샤드에 남음"""
+
+    def __init__(self, num_shards, replicas=64):
+        self.num_shards = num_shards
+        self._ring = sorted(
+            (_hash(f"shard-{shard}#{i}"), shard)
+            for shard in range(num_shards)
+            for i in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    def shard_for(self, nx, ny):
+        index = bisect.bisect(self._keys, _hash(f"{nx},{ny}")) % len(self._ring)
+        return self._ring[index][1]
+
+
+class Coordinator:
+    def __init__(self, queue, num_shards):
+        self.queue = queue
+        self.ring = HashRing(num_shards)
+
+    def publish_run(self, kind, subscribers, run_id=None):
+        """구독자를 격자별로 묶어 샤드 작업으로 발행 - 같은 격자는 항상 한 작업에만 들어감"""
+        run_id = run_id or f"{kind}-{datetime.now().strftime('%Y%m%d%H%M')}"
+
+        shards = {}
+        for subscriber in subscribers:
+            cell = (subscriber["nx"], subscriber["ny"])
+            shard = self.ring.shard_for(*cell)
+            cells = shards.setdefault(shard, {})
+            cells.setdefault(cell, []).append(subscriber)
+
+        published = 0
+        for shard, cells in sorted(shards.items()):
+            payload = {
+                "kind": kind,
+                "cells": [
+                    {"nx": nx, "ny": ny, "subscribers": members}
+                    for (nx, ny), members in sorted(cells.items())
+                ],
+            }
+            if self.queue.publish(run_id, shard, payload):
+                published += 1
+
+        logger.info(f"Run {run_id}: published {published} shard jobs for {len(subscribers)} subscribers")
+        return run_id
+
+
+class LeaseKeeper(threading.Thread):
+    """작업 처리 중 리스를 주기적으로 갱신 - 갱신 실패 시 lost 플래그를 세워 처리를 중단시킴"""
+
+    def __init__(self, queue_path, job_id, worker_id, lease_seconds):
+        super().__init__(daemon=True)
+        self.queue_path = queue_path
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.lost = threading.Event()
+
+    def run(self):
+        queue = WorkQueue(self.queue_path)
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                if not queue.renew(self.job_id, self.worker_id, self.lease_seconds):
+                    logger.error(f"Lost lease on job {self.job_id}")
+                    self.lost.set()
+                    return
+        finally:
+            queue.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class ShardWorker:
+    def __init__(self, queue, worker_id=None, lease_seconds=60, clock=None):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.clock = clock or SYSTEM_CLOCK
+        self.cache = ForecastCache()
+        self.quota = QuotaLedger(clock=self.clock)
+        self.session = default_session(self.quota)
+        services = {"cache": self.cache, "quota": self.quota, "clock": self.clock, "session": self.session}
+        self.weather_service = WeatherService(**services)
+        self.ultra_service = UltraShortForecastService(**services)
+        self.timeline_service = TimelineService(self.weather_service, self.ultra_service, clock=self.clock)
+        self.air_service = AirQualityService(**services)
+        self.dust_service = DustForecastService(**services)
+        self.kakao_service = KakaoTalkService(quota=self.quota)
+        self.outbox = Outbox(clock=self.clock)
+
+    def _set_priorities(self, kind):
+        forecast_priority, ultra_priority, send_priority = JOB_PRIORITIES[kind]
+        self.weather_service.priority = forecast_priority
+        self.air_service.priority = forecast_priority
+        self.dust_service.priority = forecast_priority
+        self.ultra_service.priority = ultra_priority
+        self.kakao_service.priority = send_priority
+
+    def _process_digest(self, cell, lease):
+        user_ids = [s["id"] for s in cell["subscribers"]]
+        # 재할당된 작업이면 이미 outbox에 들어간 구독자는 건너뜀 (모두 들어가 있으면 조회 없이 발송만)
+        today = self.clock.now().strftime("%Y%m%d")
+        subscribers = [s for s in cell["subscribers"] if not self.outbox.exists(s["id"], today, "digest")]
+        if subscribers:
+            self._enqueue_digests(cell, subscribers, lease)
+
+        self.kakao_service.send_outbox(self.outbox, user_ids, "digest")
+        # 발송 못 한 메시지가 남으면 격자 실패로 돌려 재시도 대상에 포함
+        undelivered = self.outbox.pending(user_ids, "digest")
+        if undelivered:
+            raise RuntimeError(f"{len(undelivered)} digests undelivered for {cell['nx']},{cell['ny']}")
+
+    def _enqueue_digests(self, cell, subscribers, lease):
+        timeline = self.timeline_service.get_timeline(cell["nx"], cell["ny"])
+        if not timeline or not timeline.village_base:
+            raise RuntimeError(f"Failed to fetch weather data for {cell['nx']},{cell['ny']}")
+        forecast = timeline.daily_forecast()
+
+        air_by_station = {}
+        for subscriber in subscribers:
+            if lease.lost.is_set():
+                raise RuntimeError("Lease lost during processing")
+
+            station = subscriber.get("station")
+            if station not in air_by_station:
+                air_by_station[station] = self.air_service.get_air_quality(station) if station else None
+
+            # 권역 예보는 전국이 한 번에 오므로 캐시된 인덱스에서 바로 조회
+            dust_outlook = self.dust_service.get_outlook(subscriber.get("region", "서울"))
+
+            message = build_message(
+                forecast, air_by_station[station], subscriber.get("gender", "male"), subscriber.get("location", "서울"),
+                self.clock, dust_outlook,
+            )
+            self.outbox.enqueue(
+                subscriber["id"], forecast["date"], "digest", forecast["base"], message, subscriber.get("uuid")
+            )
+
+    def _process_rain(self, cell, lease):
+        state_file = f"rain_alert_state_{cell['nx']}_{cell['ny']}.json"
+        scheduler = AdaptiveRainScheduler(
+            self.weather_service, state_file=f"rain_poll_state_{cell['nx']}_{cell['ny']}.json"
+        )
+        check_and_alert(
+            cell["nx"], cell["ny"],
+            state_file=state_file,
+            forecast_service=self.ultra_service,
+            timeline_service=self.timeline_service,
+            kakao_service=self.kakao_service,
+            scheduler=scheduler,
+            outbox=self.outbox,
+            recipients=rain_recipients(cell["nx"], cell["ny"], cell["subscribers"]),
+        )
+
+    def process(self, job):
+        """작업의 격자를 하나씩 처리 - 실패한 격자는 로그만 남기고 계속 진행하며 목록으로 반환"""
+        handlers = {"digest": self._process_digest, "rain": self._process_rain}
+        payload = job["payload"]
+        handler = handlers[payload["kind"]]
+        self._set_priorities(payload["kind"])
+
+        failed = []
+        lease = LeaseKeeper(self.queue.path, job["id"], self.worker_id, self.lease_seconds)
+        lease.start()
+        try:
+            for cell in payload["cells"]:
+                if lease.lost.is_set():
+                    raise RuntimeError("Lease lost during processing")
+                try:
+                    handler(cell, lease)
+                except Exception as e:
+                    if lease.lost.is_set():
+                        raise
+                    logger.error(f"[{self.worker_id}] cell {cell['nx']},{cell['ny']} failed: {e}")
+                    failed.append(cell)
+        finally:
+            lease.stop()
+        return failed
+
+    def run(self, poll_interval=None):
+        """큐가 빌 때까지 작업 처리 (poll_interval 지정 시 계속 대기)"""
+        processed = 0
+        while True:
+            job = self.queue.claim(self.worker_id, self.lease_seconds)
+            if job is None:
+                if poll_interval is None:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f"[{self.worker_id}] processing job {job['id']} (run {job['run_id']}, shard {job['shard']})")
+            try:
+                failed = self.process(job)
+                if failed:
+                    # 실패한 격자만 남겨 재시도
+                    self.queue.fail(
+                        job["id"], self.worker_id, f"{len(failed)} cells failed",
+                        payload={**job["payload"], "cells": failed},
+                    )
+                else:
+                    self.queue.complete(job["id"], self.worker_id)
+                    processed += 1
+            except Exception as e:
+                logger.error(f"[{self.worker_id}] job {job['id']} failed: {e}")
+                self.queue.fail(job["id"], self.worker_id, e)
+            finally:
+                # 작업마다 저장해 워커가 중간에 죽어도 받아 둔 예보를 다른 워커가 재사용
+                self.cache.save()
+
+        logger.info(f"[{self.worker_id}] processed {processed} jobs")
+        logger.info(
+            f"[{self.worker_id}] coalesced requests - village: {WeatherService.flight.stats()}, "
+            f"ultra short: {UltraShortForecastService.flight.stats()}, air: {AirQualityService.flight.stats()}"
+        )
+        if self.session:
+            logger.info(f"[{self.worker_id}] hedged requests: {self.session.stats()}")
+        return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="격자 샤딩 기반 다중 워커 발송")
+    subparsers = parser.add_subparsers(dest="role", required=True)
+
+    coordinator_parser = subparsers.add_parser("coordinator", help="구독자를 샤드 작업으로 발행")
+    coordinator_parser.add_argument("kind", choices=JOB_KINDS)
+    coordinator_parser.add_argument("--shards", type=int, default=8)
+
+    worker_parser = subparsers.add_parser("worker", help="샤드 작업 처리")
+    worker_parser.add_argument("--id")
+    worker_parser.add_argument("--lease", type=int, default=60)
+    worker_parser.add_argument("--poll", type=float, help="큐가 비어도 종료하지 않고 N초마다 확인")
+
+    args = parser.parse_args()
+    queue = WorkQueue()
+
+    if args.role == "coordinator":
+        Coordinator(queue, args.shards).publish_run(args.kind, load_subscribers())
+    else:
+        ShardWorker(queue, args.id, args.lease).run(args.poll)
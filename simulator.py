@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+import requests
+from dotenv import load_dotenv
+from weather import WeatherService
+from ultra_short_forecast import UltraShortForecastService
+from air_quality import AirQualityService
+from dust_forecast import DustForecastService
+from forecast_cache import ForecastCache
+from cache_warmer import CacheWarmer, KINDS
+from adaptive_polling import AdaptiveRainScheduler
+from quota import QuotaLedger, PRIORITY_DIGEST, PRIORITY_POLL
+from subscribers import load_subscribers, distinct_cells, rain_recipients
+from clock import SYSTEM_CLOCK, SimulatedClock
+from main import build_message
+from rain_alert import check_and_alert
+from kakao_service import KakaoTalkService
+from outbox import Outbox
+from timeline import TimelineService
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RECORDING_FILE = "upstream_recording.jsonl"
+
+# 캐시 워머 실행 시각 (매시 N분) - 발표 후 데이터가 올라오는 시각 기준
+WARM_MINUTES = {
+    "village": 10,
+    "ultra_short": 45,
+    "air_quality": 15,
+    "dust_forecast": 30,
+}
+
+
+def _request_key(url, params):
+    params = {k: v for k, v in (params or {}).items() if k != "serviceKey"}
+    return json.dumps([url.rsplit("/", 1)[-1], sorted(params.items())], ensure_ascii=False)
+
+
+class RecordingSession:
+    """실제 API를 호출하면서 응답을 JSONL로 기록 (하루치를 모아 재현에 사용)"""
+
+    def __init__(self, path=RECORDING_FILE, clock=SYSTEM_CLOCK):
+        self.path = path
+        self.clock = clock
+
+    def get(self, url, params=None, timeout=None):
+        response = requests.get(url, params=params, timeout=timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+
+        record = {
+            "recorded_at": self.clock.now().isoformat(),
+            "key": _request_key(url, params),
+            "status": response.status_code,
+            "body": body,
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return response
+
+
+class ReplayResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.text = json.dumps(body, ensure_ascii=False) if body is not None else ""
+
+    def json(self):
+        if self._body is None:
+            raise ValueError("No JSON body recorded")
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} (replay)")
+
+
+class ReplaySession:
+    """기록된 응답을 시뮬레이션 시각 기준으로 재현 - 아직 기록되지 않은 시점의 요청은 404"""
+
+    def __init__(self, path, clock):
+        self.clock = clock
+        self.calls = 0
+        self.misses = 0
+        self._records = {}
+        with open(path, "r") as f:
+            for line in f:
+                record = json.loads(line)
+                record["recorded_at"] = datetime.fromisoformat(record["recorded_at"])
+                self._records.setdefault(record["key"], []).append(record)
+        for records in self._records.values():
+            records.sort(key=lambda r: r["recorded_at"])
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        now = self.clock.now()
+        available = [r for r in self._records.get(_request_key(url, params), []) if r["recorded_at"] <= now]
+        if not available:
+            self.misses += 1
+            return ReplayResponse(404, None)
+        return ReplayResponse(available[-1]["status"], available[-1]["body"])
+
+
+class DryRunKakaoService(KakaoTalkService):
+    """실제 발송 없이 메시지만 기록"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def send_me_message(self, text, web_url="https://www.weather.go.kr"):
+        self.sent.append((self.clock.now(), text))
+        return True
+
+    def send_friends_message(self, text, receiver_uuids, web_url="https://www.weather.go.kr"):
+        self.sent.extend((self.clock.now(), text) for _ in receiver_uuids)
+        return list(receiver_uuids), {}
+
+
+class DaySimulator:
+    """기록된 하루치 발표 데이터를 가속 재현하며 아침 발송/비 알림 흐름 실행"""
+
+    def __init__(self, recording, day, subscribers, digest_time="0700", tick_minutes=10,
+                 warm=True, adaptive=True, speed=None):
+        self.recording = recording
+        self.day = day
+        self.subscribers = subscribers
+        self.digest_time = digest_time
+        self.tick_minutes = tick_minutes
+        self.warm = warm
+        self.adaptive = adaptive
+        self.speed = speed
+
+    def _due_warm_kinds(self, now):
+        return [
+            kind for kind in KINDS
+            if 0 <= now.minute - WARM_MINUTES[kind] < self.tick_minutes
+            and (kind != "village" or now.hour % 3 == 2)
+            and (kind != "dust_forecast" or now.hour in (5, 11, 17, 23))
+        ]
+
+    def run(self):
+        start = datetime.strptime(self.day, "%Y%m%d")
+        clock = SimulatedClock(start)
+        report = {}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            session = ReplaySession(self.recording, clock)
+            cache = ForecastCache(os.path.join(tmp, "forecast_cache.json"))
+            quota = QuotaLedger(os.path.join(tmp, "quota_ledger.db"), clock=clock)
+            service_key = os.getenv("KMA_SERVICE_KEY") or "replay"
+            air_key = os.getenv("AIRKOREA_SERVICE_KEY") or "replay"
+
+            weather_service = WeatherService(
+                service_key, cache=cache, quota=quota, priority=PRIORITY_DIGEST, clock=clock, session=session
+            )
+            ultra_service = UltraShortForecastService(
+                service_key, cache=cache, quota=quota, priority=PRIORITY_POLL, clock=clock, session=session
+            )
+            air_service = AirQualityService(
+                air_key, cache=cache, quota=quota, priority=PRIORITY_DIGEST, clock=clock, session=session
+            )
+            dust_service = DustForecastService(
+                air_key, cache=cache, quota=quota, priority=PRIORITY_DIGEST, clock=clock, session=session
+            )
+            timeline_service = TimelineService(weather_service, ultra_service, clock=clock)
+            kakao_service = DryRunKakaoService(clock)
+            outbox = Outbox(os.path.join(tmp, "outbox.db"), clock=clock)
+            warmer = CacheWarmer(
+                cache, self.subscribers, quota, clock=clock, session=session,
+                weather_service=weather_service, ultra_service=ultra_service,
+                air_service=air_service, dust_service=dust_service,
+            )
+
+            scheduler = None
+            if self.adaptive:
+                scheduler = AdaptiveRainScheduler(
+                    weather_service, state_file=os.path.join(tmp, "rain_poll_state.json"),
+                    tick_minutes=self.tick_minutes, clock=clock,
+                )
+
+            while clock.now() < start + timedelta(days=1):
+                now = clock.now()
+                cpu_start = time.process_time()
+                calls_before, hits_before = session.calls, cache.hits
+                sent_before = len(kakao_service.sent)
+                digests = 0
+
+                if self.warm:
+                    kinds = self._due_warm_kinds(now)
+                    if kinds:
+                        warmer.warm(kinds)
+
+                if now.strftime("%H%M") == self.digest_time:
+                    for subscriber in self.subscribers:
+                        timeline = timeline_service.get_timeline(subscriber["nx"], subscriber["ny"])
+                        if not timeline or not timeline.village_base:
+                            continue
+                        forecast = timeline.daily_forecast()
+                        air_quality = air_service.get_air_quality(subscriber["station"])
+                        dust_outlook = dust_service.get_outlook(subscriber["region"])
+                        message = build_message(
+                            forecast, air_quality, subscriber["gender"], subscriber["location"], clock,
+                            dust_outlook,
+                        )
+                        outbox.enqueue(
+                            subscriber["id"], forecast["date"], "digest", forecast["base"], message,
+                            subscriber.get("uuid"),
+                        )
+                    # 같은 수신자에게 같은 문구는 한 번만 나가므로 실제 발송 건수로 집계
+                    digests = kakao_service.send_outbox(outbox, [s["id"] for s in self.subscribers], "digest")
+
+                for nx, ny in distinct_cells(self.subscribers):
+                    check_and_alert(
+                        nx, ny,
+                        state_file=os.path.join(tmp, f"rain_alert_state_{nx}_{ny}.json"),
+                        forecast_service=ultra_service,
+                        timeline_service=timeline_service,
+                        kakao_service=kakao_service,
+                        scheduler=scheduler,
+                        clock=clock,
+                        outbox=outbox,
+                        recipients=rain_recipients(nx, ny, self.subscribers),
+                    )
+
+                hour = report.setdefault(now.hour, {"api_calls": 0, "cache_hits": 0, "digests": 0,
+                                                    "alerts": 0, "cpu_ms": 0.0})
+                hour["api_calls"] += session.calls - calls_before
+                hour["cache_hits"] += cache.hits - hits_before
+                hour["digests"] += digests
+                hour["alerts"] += len(kakao_service.sent) - sent_before - digests
+                hour["cpu_ms"] += (time.process_time() - cpu_start) * 1000
+
+                clock.advance(minutes=self.tick_minutes)
+                if self.speed:
+                    time.sleep(self.tick_minutes * 60 / self.speed)
+
+            report["replay_misses"] = session.misses
+            if scheduler:
+                report["adaptive_polling"] = scheduler.report(self.day)
+
+        return report
+
+
+def print_report(report):
+    print(f"{'시각':>4} | {'API 호출':>8} | {'캐시 적중':>8} | {'아침 발송':>8} | {'비 알림':>6} | {'CPU(ms)':>8}")
+    for hour in range(24):
+        row = report.get(hour)
+        if not row:
+            continue
+        print(f"{hour:02d}시 | {row['api_calls']:>8} | {row['cache_hits']:>8} | {row['digests']:>8} | "
+              f"{row['alerts']:>6} | {row['cpu_ms']:>8.1f}")
+    print(f"\n기록에 없는 요청: {report['replay_misses']}회")
+    if "adaptive_polling" in report:
+        print(f"적응형 확인: {report['adaptive_polling']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="업스트림 응답 기록 및 하루 재현 시뮬레이터")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="캐시 워머를 실행하며 응답 기록 (cron에서 워머 대신 실행)")
+    record_parser.add_argument("kinds", nargs="*", choices=KINDS, default=list(KINDS))
+    record_parser.add_argument("--file", default=RECORDING_FILE)
+
+    replay_parser = subparsers.add_parser("replay", help="기록된 하루를 가속 재현")
+    replay_parser.add_argument("day", help="YYYYMMDD")
+    replay_parser.add_argument("--file", default=RECORDING_FILE)
+    replay_parser.add_argument("--digest", default="0700", help="아침 발송 시각 HHMM")
+    replay_parser.add_argument("--tick", type=int, default=10, help="비 알림 cron 간격(분)")
+    replay_parser.add_argument("--no-warm", action="store_true", help="캐시 워머 없이 재현")
+    replay_parser.add_argument("--fixed", action="store_true", help="적응형 확인 대신 고정 주기")
+    replay_parser.add_argument("--speed", type=float, help="가속 배율 (지정하지 않으면 최대 속도)")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        CacheWarmer(session=RecordingSession(args.file)).warm(args.kinds)
+    else:
+        logging.getLogger().setLevel(logging.WARNING)
+        simulator = DaySimulator(
+            args.file, args.day, load_subscribers(),
+            digest_time=args.digest, tick_minutes=args.tick,
+            warm=not args.no_warm, adaptive=not args.fixed, speed=args.speed,
+        )
+        print_report(simulator.run())
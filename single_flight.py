@@ -0,0 +1,63 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+def flight_key(service, *key):
+    """요청 키에 서비스 키/우선순위/한도/캐시를 붙임 - 조건이 같은 호출끼리만 합침
+
+    (우선순위 낮은 호출의 한도 거부 결과가 우선순위 높은 호출에 전달되지 않도록)
+    """
+    return (*key, service.service_key, service.priority, id(service.quota), id(service.cache))
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 하나로 합침 - 먼저 온 호출만 실행하고 나머지는 결과를 공유
+
+    스레드 호출자는 do(), asyncio 호출자는 do_async()를 사용하며 둘이 섞여도 같은 키면 합쳐짐
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.executed += 1
+            return future, True
+
+    def _run(self, key, future, fn, args, kwargs):
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def do(self, key, fn, *args, **kwargs):
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        return future.result()
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        future, leader = self._join(key)
+        if leader:
+            await asyncio.to_thread(self._run, key, future, fn, args, kwargs)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
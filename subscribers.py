@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SUBSCRIBERS_FILE = "subscribers.json"
+
+
+def default_subscriber():
+    return {
+        "id": "me",
+        "location": "서울",
+        "nx": 60,
+        "ny": 127,
+        "station": "중구",
+        "region": "서울",
+        "gender": os.getenv("GENDER", "male"),
+    }
+
+
+def load_subscribers(path=SUBSCRIBERS_FILE):
+    """구독자 목록 로드 - 파일이 없으면 기본 사용자(서울/중구) 1명"""
+    if not os.path.exists(path):
+        return [default_subscriber()]
+
+    with open(path, "r") as f:
+        entries = json.load(f)
+
+    subscribers = []
+    for entry in entries:
+        subscriber = default_subscriber()
+        subscriber.update(entry)
+        subscriber["nx"] = int(subscriber["nx"])
+        subscriber["ny"] = int(subscriber["ny"])
+        subscribers.append(subscriber)
+
+    logger.info(f"Loaded {len(subscribers)} subscribers from {path}")
+    return subscribers
+
+
+def distinct_cells(subscribers):
+    return sorted({(s["nx"], s["ny"]) for s in subscribers})
+
+
+def distinct_stations(subscribers):
+    return sorted({s["station"] for s in subscribers if s.get("station")})
+
+
+def rain_recipients(nx, ny, subscribers):
+    """격자 비 알림 수신자 (id, 친구 UUID) 목록 - UUID가 없는 구독자는 나에게 보내기 한 번으로 묶음"""
+    members = [s for s in subscribers if (s["nx"], s["ny"]) == (nx, ny)]
+    recipients = [(s["id"], s["uuid"]) for s in members if s.get("uuid")]
+    if len(recipients) < len(members):
+        recipients.append((f"rain:{nx},{ny}", None))
+    return recipients
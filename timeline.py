@@ -0,0 +1,142 @@
+import logging
+from datetime import datetime, timedelta
+from weather import WeatherService, SKY_TEXT, build_daily_forecast
+from ultra_short_forecast import UltraShortForecastService
+from clock import SYSTEM_CLOCK
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+VILLAGE = "village"
+ULTRA_SHORT = "ultra_short"
+
+# 초단기예보 값으로 덮어쓰는 항목 (T1H, PTY, RN1, SKY)
+OVERLAY_FIELDS = ("temp", "sky", "pty", "rn1")
+
+
+def _key(date, time):
+    return f"{date}_{time}"
+
+
+class Timeline:
+    """격자별 시간대 예보 - 향후 hours 시간은 최신 초단기예보 값을 단기예보 위에 덮어씀
+
+    각 시간대의 sources에 항목별 출처(village/ultra_short)와 발표시각 기록
+    """
+
+    def __init__(self, nx, ny, village=None, village_base=None, ultra=None, ultra_base=None,
+                 hours=6, clock=None):
+        self.nx = nx
+        self.ny = ny
+        self.village_base = village_base
+        self.ultra_base = ultra_base
+        self.clock = clock or SYSTEM_CLOCK
+        self.entries = {}
+
+        for entry in (village or {}).values():
+            merged = dict(entry)
+            merged["sources"] = {
+                field: {"source": VILLAGE, "base": village_base} for field in entry if field in OVERLAY_FIELDS
+            }
+            self.entries[_key(entry["date"], entry["time"])] = merged
+
+        until = self.clock.now() + timedelta(hours=hours)
+        for entry in ultra or []:
+            if datetime.strptime(f"{entry['date']}{entry['time']}", "%Y%m%d%H%M") > until:
+                continue
+            self._overlay(entry)
+
+    def _overlay(self, entry):
+        merged = self.entries.setdefault(
+            _key(entry["date"], entry["time"]),
+            {"date": entry["date"], "time": entry["time"], "hour": entry["hour"], "sources": {}},
+        )
+        source = {"source": ULTRA_SHORT, "base": self.ultra_base}
+
+        if entry.get("temp") is not None:
+            merged["temp"] = int(float(entry["temp"]))
+            merged["sources"]["temp"] = source
+        if entry.get("sky") is not None:
+            merged["sky"] = entry["sky"]
+            merged["sky_text"] = SKY_TEXT.get(entry["sky"], "알 수 없음")
+            merged["sources"]["sky"] = source
+        if entry.get("pty") is not None:
+            merged["pty"] = entry["pty"]
+            merged["pty_text"] = UltraShortForecastService.PTY_MAP.get(entry["pty"]) or "없음"
+            merged["sources"]["pty"] = source
+        if entry.get("rn1") is not None:
+            merged["rn1"] = entry["rn1"]
+            merged["sources"]["rn1"] = source
+
+    def series(self, date=None):
+        entries = [self.entries[key] for key in sorted(self.entries)]
+        if date:
+            entries = [entry for entry in entries if entry["date"] == date]
+        return entries
+
+    def ultra_short(self):
+        """초단기예보가 덮어쓴 시간대를 초단기예보 형식(강수 없음 = pty_text None)으로 반환 - 비 알림용"""
+        forecast = []
+        for entry in self.series():
+            if entry["sources"].get("pty", {}).get("source") != ULTRA_SHORT:
+                continue
+            view = dict(entry)
+            view["minute"] = int(entry["time"][2:])
+            view["pty_text"] = UltraShortForecastService.PTY_MAP.get(entry["pty"])
+            forecast.append(view)
+        return forecast
+
+    def daily_forecast(self):
+        """WeatherService.get_daily_forecast와 같은 형식의 오늘/내일 예보 (ultra_base 추가)"""
+        forecast = build_daily_forecast(self.entries, self.village_base or self.ultra_base, self.clock.now())
+        forecast["ultra_base"] = self.ultra_base
+        return forecast
+
+
+class TimelineService:
+    """단기예보 + 초단기예보를 격자별 Timeline 하나로 합쳐 아침 발송과 비 알림이 같이 사용
+
+    발표시각이 바뀌지 않으면 만들어 둔 Timeline을 그대로 반환 (서비스가 None이면 해당 예보 없이 구성)
+    """
+
+    def __init__(self, weather_service=None, ultra_service=None, hours=6, clock=None):
+        self.weather_service = weather_service
+        self.ultra_service = ultra_service
+        self.hours = hours
+        self.clock = clock or SYSTEM_CLOCK
+        self._timelines = {}
+
+    def _bases(self):
+        village_base = "".join(self.weather_service._get_base_time()) if self.weather_service else None
+        ultra_base = "".join(self.ultra_service._get_base_time()) if self.ultra_service else None
+        return village_base, ultra_base
+
+    def get_timeline(self, nx=60, ny=127):
+        village_base, ultra_base = self._bases()
+        timeline = self._timelines.get((nx, ny))
+        if timeline and (timeline.village_base, timeline.ultra_base) == (village_base, ultra_base):
+            return timeline
+
+        # 한도 부족으로 이전 발표를 받으면 그 발표시각을 기록 (다음 호출 때 다시 조회)
+        village, village_base = self.weather_service.get_hourly_data(nx, ny) if self.weather_service else (None, None)
+        ultra, ultra_base = self.ultra_service.get_forecast_with_base(nx, ny) if self.ultra_service else (None, None)
+        if village is None and ultra is None:
+            return None
+
+        timeline = Timeline(
+            nx, ny,
+            village=village, village_base=village_base,
+            ultra=ultra, ultra_base=ultra_base,
+            hours=self.hours, clock=self.clock,
+        )
+        self._timelines[(nx, ny)] = timeline
+        return timeline
+
+
+if __name__ == "__main__":
+    timeline = TimelineService(WeatherService(), UltraShortForecastService()).get_timeline()
+    if timeline:
+        print(f"=== 단기예보 {timeline.village_base} + 초단기예보 {timeline.ultra_base} ===")
+        for h in timeline.series(SYSTEM_CLOCK.now().strftime("%Y%m%d")):
+            sources = ", ".join(f"{field}={s['source']}" for field, s in sorted(h["sources"].items()))
+            print(f"  {h['hour']:02d}시: {h.get('temp', '?')}°C, {h.get('pty_text', '?')} ({sources})")
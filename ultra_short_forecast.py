@@ -3,6 +3,9 @@ from datetime import datetime, timedelta
 import logging
 import os
 from dotenv import load_dotenv
+from quota import PRIORITY_ALERT
+from single_flight import SingleFlight, flight_key
+from clock import SYSTEM_CLOCK
 
 load_dotenv()
 
@@ -23,12 +26,20 @@ class UltraShortForecastService:
         "7": "눈날림",
     }
 
-    def __init__(self, service_key=None):
+    flight = SingleFlight()
+
+    def __init__(self, service_key=None, cache=None, quota=None, priority=PRIORITY_ALERT,
+                 clock=None, session=None):
         self.service_key = service_key or os.getenv("KMA_SERVICE_KEY")
+        self.cache = cache
+        self.quota = quota
+        self.priority = priority
+        self.clock = clock or SYSTEM_CLOCK
+        self.session = session or requests
         self.base_url = "https://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getUltraSrtFcst"
 
     def _get_base_time(self):
-        now = datetime.now()
+        now = self.clock.now()
         minute = now.minute
         
         if minute < 45:
@@ -39,12 +50,46 @@ class UltraShortForecastService:
         return base.strftime("%Y%m%d"), f"{base.hour:02d}30"
 
     def get_forecast(self, nx=60, ny=127):
+        return self.get_forecast_with_base(nx, ny)[0]
+
+    def get_forecast_with_base(self, nx=60, ny=127):
+        """초단기예보와 발표시각 - 한도 부족 시 이전 발표와 그 발표시각"""
+        if not self.service_key:
+            logger.error("KMA_SERVICE_KEY is missing.")
+            return None, None
+
+        base_date, base_time = self._get_base_time()
+        return self.flight.do(flight_key(self, nx, ny, base_date, base_time), self._get_forecast, nx, ny, base_date, base_time)
+
+    async def get_forecast_async(self, nx=60, ny=127):
         if not self.service_key:
             logger.error("KMA_SERVICE_KEY is missing.")
             return None
 
         base_date, base_time = self._get_base_time()
-        
+        forecast, _ = await self.flight.do_async(
+            flight_key(self, nx, ny, base_date, base_time), self._get_forecast, nx, ny, base_date, base_time
+        )
+        return forecast
+
+    def _get_forecast(self, nx, ny, base_date, base_time):
+        base = f"{base_date}{base_time}"
+        if self.cache:
+            cached = self.cache.get("ultra_short", f"{nx},{ny}", base)
+            if cached is not None:
+                return cached, base
+
+        if self.quota and not self.quota.acquire(self.service_key, "getUltraSrtFcst", self.priority):
+            return self.cache.get_latest("ultra_short", f"{nx},{ny}") if self.cache else (None, None)
+
+        forecast = self._fetch_forecast(nx, ny, base_date, base_time)
+        if forecast is None:
+            return None, None
+        if self.cache:
+            self.cache.put("ultra_short", f"{nx},{ny}", base, forecast)
+        return forecast, base
+
+    def _fetch_forecast(self, nx, ny, base_date, base_time):
         params = {
             "serviceKey": self.service_key,
             "pageNo": "1",
@@ -57,7 +102,7 @@ class UltraShortForecastService:
         }
 
         try:
-            response = requests.get(self.base_url, params=params, timeout=15)
+            response = self.session.get(self.base_url, params=params, timeout=15)
             response.raise_for_status()
             data = response.json()
 
@@ -102,12 +147,12 @@ class UltraShortForecastService:
             logger.error(f"Error fetching ultra short forecast: {e}")
             return None
 
-    def check_upcoming_rain(self, nx=60, ny=127, within_minutes=60):
-        forecast = self.get_forecast(nx, ny)
+    def check_upcoming_rain(self, nx=60, ny=127, within_minutes=60, forecast=None):
+        forecast = forecast or self.get_forecast(nx, ny)
         if not forecast:
             return None
         
-        now = datetime.now()
+        now = self.clock.now()
         
         for entry in forecast:
             fcst_datetime = datetime.strptime(
@@ -1,23 +1,75 @@
 import requests
-from datetime import datetime, timedelta
+from datetime import timedelta
 import logging
 import os
 from dotenv import load_dotenv
+from quota import PRIORITY_ALERT
+from single_flight import SingleFlight, flight_key
+from clock import SYSTEM_CLOCK
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+SKY_TEXT = {"1": "맑음", "3": "구름많음", "4": "흐림"}
+PTY_TEXT = {"0": "없음", "1": "비", "2": "비/눈", "3": "눈", "4": "소나기"}
+
+
+def build_daily_forecast(hourly_data, base, now):
+    """"날짜_시각" 키의 시간대별 예보 → 오늘/내일 예보 (최저/최고 기온 포함)"""
+    today = now.strftime("%Y%m%d")
+    tomorrow = (now + timedelta(days=1)).strftime("%Y%m%d")
+
+    today_forecast = []
+    tomorrow_forecast = []
+    
+    for key in sorted(hourly_data.keys()):
+        entry = hourly_data[key]
+        if entry["date"] == today:
+            today_forecast.append(entry)
+        elif entry["date"] == tomorrow:
+            tomorrow_forecast.append(entry)
+    
+    temps = [h.get("temp") for h in today_forecast if h.get("temp") is not None]
+    min_temp = min(temps) if temps else None
+    max_temp = max(temps) if temps else None
+    
+    for h in today_forecast:
+        if h.get("min_temp"):
+            min_temp = h["min_temp"]
+        if h.get("max_temp"):
+            max_temp = h["max_temp"]
+    
+    return {
+        "date": today,
+        "base": base,
+        "min_temp": min_temp,
+        "max_temp": max_temp,
+        "hourly": today_forecast,
+        "tomorrow": tomorrow_forecast
+    }
+
+
 class WeatherService:
-    def __init__(self, service_key=None):
+    # 같은 (nx, ny, base_date, base_time)의 동시 요청은 인스턴스와 무관하게 한 번만 호출
+    flight = SingleFlight()
+
+    def __init__(self, service_key=None, cache=None, quota=None, priority=PRIORITY_ALERT,
+                 clock=None, session=None):
         self.service_key = service_key or os.getenv("KMA_SERVICE_KEY")
+        self.cache = cache
+        self.quota = quota
+        self.priority = priority
+        self.clock = clock or SYSTEM_CLOCK
+        self.session = session or requests
         self.base_url = "https://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getVilageFcst"
         self.base_times = ["0200", "0500", "0800", "1100", "1400", "1700", "2000", "2300"]
+        self.fetches = 0
 
     def _get_base_time(self):
         """기상청 API 발표 시간: 02, 05, 08, 11, 14, 17, 20, 23시 (발표 후 ~10분 후 데이터 가용)"""
-        now = datetime.now()
+        now = self.clock.now()
         current_hour = now.hour * 100 + now.minute
         
         for bt in reversed(self.base_times):
@@ -27,15 +79,65 @@ class WeatherService:
         yesterday = now - timedelta(days=1)
         return yesterday.strftime("%Y%m%d"), "2300"
 
+    def get_hourly_data(self, nx=60, ny=127):
+        """시간대별 예보 원자료와 발표시각(base_date + base_time) - 한도 부족 시 이전 발표와 그 발표시각"""
+        if not self.service_key:
+            logger.error("KMA_SERVICE_KEY is missing.")
+            return None, None
+
+        base_date, base_time = self._get_base_time()
+        return self.flight.do(
+            flight_key(self, nx, ny, base_date, base_time), self._get_hourly_data, nx, ny, base_date, base_time
+        )
+
     def get_daily_forecast(self, nx=60, ny=127):
+        hourly_data, base = self.get_hourly_data(nx, ny)
+        return self._build_daily_forecast(hourly_data, base)
+
+    async def get_daily_forecast_async(self, nx=60, ny=127):
         if not self.service_key:
             logger.error("KMA_SERVICE_KEY is missing.")
             return None
 
         base_date, base_time = self._get_base_time()
-        today = datetime.now().strftime("%Y%m%d")
-        tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y%m%d")
-        
+        hourly_data, base = await self.flight.do_async(
+            flight_key(self, nx, ny, base_date, base_time), self._get_hourly_data, nx, ny, base_date, base_time
+        )
+        return self._build_daily_forecast(hourly_data, base)
+
+    def get_cached_daily_forecast(self, nx=60, ny=127):
+        """캐시에 이미 있는 현재 발표의 예보로만 구성 (API 호출 없음) - 없으면 None"""
+        if not self.cache:
+            return None
+
+        base_date, base_time = self._get_base_time()
+        base = f"{base_date}{base_time}"
+        return self._build_daily_forecast(self.cache.get("village", f"{nx},{ny}", base), base)
+
+    def _build_daily_forecast(self, hourly_data, base):
+        if hourly_data is None:
+            return None
+        return build_daily_forecast(hourly_data, base, self.clock.now())
+
+    def _get_hourly_data(self, nx, ny, base_date, base_time):
+        base = f"{base_date}{base_time}"
+        if self.cache:
+            cached = self.cache.get("village", f"{nx},{ny}", base)
+            if cached is not None:
+                return cached, base
+
+        if self.quota and not self.quota.acquire(self.service_key, "getVilageFcst", self.priority):
+            return self.cache.get_latest("village", f"{nx},{ny}") if self.cache else (None, None)
+
+        self.fetches += 1
+        hourly_data = self._fetch_hourly_data(nx, ny, base_date, base_time)
+        if hourly_data is None:
+            return None, None
+        if self.cache:
+            self.cache.put("village", f"{nx},{ny}", base, hourly_data)
+        return hourly_data, base
+
+    def _fetch_hourly_data(self, nx, ny, base_date, base_time):
         params = {
             "serviceKey": self.service_key,
             "pageNo": "1",
@@ -48,7 +150,7 @@ class WeatherService:
         }
 
         try:
-            response = requests.get(self.base_url, params=params, timeout=15)
+            response = self.session.get(self.base_url, params=params, timeout=15)
             response.raise_for_status()
             data = response.json()
 
@@ -92,34 +194,8 @@ class WeatherService:
                     hourly_data[key]["min_temp"] = int(float(value))
                 elif category == "TMX":
                     hourly_data[key]["max_temp"] = int(float(value))
-            
-            today_forecast = []
-            tomorrow_forecast = []
-            
-            for key in sorted(hourly_data.keys()):
-                entry = hourly_data[key]
-                if entry["date"] == today:
-                    today_forecast.append(entry)
-                elif entry["date"] == tomorrow:
-                    tomorrow_forecast.append(entry)
-            
-            temps = [h.get("temp") for h in today_forecast if h.get("temp") is not None]
-            min_temp = min(temps) if temps else None
-            max_temp = max(temps) if temps else None
-            
-            for h in today_forecast:
-                if h.get("min_temp"):
-                    min_temp = h["min_temp"]
-                if h.get("max_temp"):
-                    max_temp = h["max_temp"]
-            
-            return {
-                "date": today,
-                "min_temp": min_temp,
-                "max_temp": max_temp,
-                "hourly": today_forecast,
-                "tomorrow": tomorrow_forecast
-            }
+
+            return hourly_data
 
         except Exception as e:
             logger.error(f"Error fetching weather data: {e}")
@@ -130,7 +206,7 @@ class WeatherService:
         if not forecast or not forecast["hourly"]:
             return None
         
-        now_hour = datetime.now().hour
+        now_hour = self.clock.now().hour
         for h in forecast["hourly"]:
             if h["hour"] >= now_hour:
                 return {
@@ -146,12 +222,10 @@ class WeatherService:
         return None
 
     def _parse_sky(self, value):
-        mapping = {"1": "맑음", "3": "구름많음", "4": "흐림"}
-        return mapping.get(value, "알 수 없음")
+        return SKY_TEXT.get(value, "알 수 없음")
 
     def _parse_pty(self, value):
-        mapping = {"0": "없음", "1": "비", "2": "비/눈", "3": "눈", "4": "소나기"}
-        return mapping.get(value, "알 수 없음")
+        return PTY_TEXT.get(value, "알 수 없음")
 
 if __name__ == "__main__":
     service = WeatherService()
@@ -0,0 +1,121 @@
+import json
+import logging
+import sqlite3
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUEUE_FILE = "work_queue.db"
+
+
+class WorkQueue:
+    """SQLite 기반 로컬 작업 큐 - 리스(lease)가 만료된 작업은 다른 워커가 다시 가져감"""
+
+    def __init__(self, path=QUEUE_FILE, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                shard INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                UNIQUE (run_id, shard)
+            )"""
+        )
+
+    def publish(self, run_id, shard, payload):
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (run_id, shard, payload) VALUES (?, ?, ?)",
+            (run_id, shard, json.dumps(payload, ensure_ascii=False)),
+        )
+        return cursor.rowcount == 1
+
+    def claim(self, worker_id, lease_seconds=60):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 워커를 계속 죽이는 작업은 리스 만료로 무한 재시도되지 않도록 시도 횟수 초과 시 실패 처리
+            abandoned = self.conn.execute(
+                """UPDATE jobs SET status = 'failed', lease_expires = NULL,
+                       error = COALESCE(error, 'lease expired after max attempts')
+                   WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?""",
+                (now, self.max_attempts),
+            ).rowcount
+            if abandoned:
+                logger.error(f"{abandoned} jobs failed after {self.max_attempts} expired leases")
+            row = self.conn.execute(
+                """SELECT id, run_id, shard, payload, worker FROM jobs
+                   WHERE status = 'pending'
+                      OR (status = 'leased' AND lease_expires < ? AND attempts < ?)
+                   ORDER BY id LIMIT 1""",
+                (now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+
+            job_id, run_id, shard, payload, previous_worker = row
+            self.conn.execute(
+                """UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?,
+                   attempts = attempts + 1 WHERE id = ?""",
+                (worker_id, now + lease_seconds, job_id),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        if previous_worker and previous_worker != worker_id:
+            logger.warning(f"Job {job_id} (shard {shard}) reassigned from {previous_worker} to {worker_id}")
+        return {"id": job_id, "run_id": run_id, "shard": shard, "payload": json.loads(payload)}
+
+    def renew(self, job_id, worker_id, lease_seconds=60):
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_seconds, job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id):
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'done', lease_expires = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+            (job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error, payload=None):
+        """payload를 주면 재시도 시 그 내용(예: 실패한 격자만)으로 처리"""
+        if payload is not None:
+            self.conn.execute(
+                "UPDATE jobs SET payload = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(payload, ensure_ascii=False), job_id, worker_id),
+            )
+        cursor = self.conn.execute(
+            """UPDATE jobs SET
+                   status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                   lease_expires = NULL, error = ?
+               WHERE id = ? AND worker = ? AND status = 'leased'""",
+            (self.max_attempts, str(error), job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def stats(self, run_id=None):
+        query = "SELECT status, COUNT(*) FROM jobs"
+        params = ()
+        if run_id:
+            query += " WHERE run_id = ?"
+            params = (run_id,)
+        rows = self.conn.execute(query + " GROUP BY status", params).fetchall()
+        return dict(rows)
+
+    def close(self):
+        self.conn.close()